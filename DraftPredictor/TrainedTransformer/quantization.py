@@ -0,0 +1,133 @@
+import os
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.ao.quantization import quantize_dynamic
+
+
+class QuantizableSelfAttention(nn.Module):
+    """
+    Self-attention with the packed Q/K/V in-projection held as an nn.Linear (nn.MultiheadAttention keeps
+    it as a raw Parameter, which dynamic quantization can't see). Same math as the source MHA.
+    """
+    def __init__(self, mha):
+        super().__init__()
+        self.embed_dim = mha.embed_dim
+        self.num_heads = mha.num_heads
+        self.in_proj = nn.Linear(self.embed_dim, 3 * self.embed_dim)
+        self.out_proj = nn.Linear(self.embed_dim, self.embed_dim)
+        with torch.no_grad():
+            self.in_proj.weight.copy_(mha.in_proj_weight)
+            self.in_proj.bias.copy_(mha.in_proj_bias)
+            self.out_proj.weight.copy_(mha.out_proj.weight)
+            self.out_proj.bias.copy_(mha.out_proj.bias)
+
+    def forward(self, x, attn_mask=None):
+        bsz, seq_len, _ = x.shape
+        head_dim = self.embed_dim // self.num_heads
+        q, k, v = self.in_proj(x).chunk(3, dim=-1)
+        q, k, v = [t.view(bsz, seq_len, self.num_heads, head_dim).transpose(1, 2) for t in (q, k, v)]
+        out = F.scaled_dot_product_attention(q, k, v, attn_mask=attn_mask)
+        return self.out_proj(out.transpose(1, 2).reshape(bsz, seq_len, self.embed_dim))
+
+
+class QuantizableEncoderLayer(nn.Module):
+    """Post-Norm encoder layer (eval only) built from an nn.TransformerEncoderLayer, reusing its FFN/norms."""
+    def __init__(self, layer):
+        super().__init__()
+        self.self_attn = QuantizableSelfAttention(layer.self_attn)
+        self.linear1 = layer.linear1
+        self.linear2 = layer.linear2
+        self.norm1 = layer.norm1
+        self.norm2 = layer.norm2
+        self.dropout = layer.dropout
+        self.dropout1 = layer.dropout1
+        self.dropout2 = layer.dropout2
+        self.activation = layer.activation
+
+    def forward(self, x, attn_mask=None):
+        x = self.norm1(x + self.dropout1(self.self_attn(x, attn_mask)))
+        ff = self.linear2(self.dropout(self.activation(self.linear1(x))))
+        return self.norm2(x + self.dropout2(ff))
+
+
+class QuantizableEncoder(nn.Module):
+    """
+    Drop-in for nn.TransformerEncoder (same call signature) over QuantizableEncoderLayers. Being plain
+    Linear / SDPA ops, it also traces to ONNX with a dynamic sequence axis and runs under torch.func.vmap.
+    """
+    def __init__(self, encoder):
+        super().__init__()
+        self.layers = nn.ModuleList([QuantizableEncoderLayer(layer) for layer in encoder.layers])
+        self.norm = encoder.norm
+
+    def forward(self, src, mask=None, src_key_padding_mask=None):
+        attn_mask = mask
+        if src_key_padding_mask is not None:
+            # [B, T] True = PAD -> additive [B, 1, 1, T], combined with the causal mask
+            pad = torch.zeros(src_key_padding_mask.shape, dtype=src.dtype, device=src.device)
+            pad = pad.masked_fill(src_key_padding_mask, float('-inf'))[:, None, None, :]
+            attn_mask = pad if attn_mask is None else attn_mask + pad
+        x = src
+        for layer in self.layers:
+            x = layer(x, attn_mask)
+        if self.norm is not None:
+            x = self.norm(x)
+        return x
+
+
+def quantize_model_int8(model):
+    """
+    Dynamic int8 quantization of a DraftTransformer for CPU serving (in place, eval only):
+    attention in/out projections, encoder feed-forward and the output head become int8 Linear layers
+    (weights quantized once, activations per batch). Embeddings and LayerNorms stay fp32.
+    """
+    model.eval()
+    model.transformer_encoder = QuantizableEncoder(model.transformer_encoder)
+    targets = {
+        f'transformer_encoder.{name}' for name, module in model.transformer_encoder.named_modules()
+        if isinstance(module, nn.Linear)
+    }
+    targets.add('output_head')
+    return quantize_dynamic(model, qconfig_spec=targets, dtype=torch.qint8, inplace=True)
+
+
+def quantized_cache_path(checkpoint_path):
+    return os.path.splitext(checkpoint_path)[0] + '.int8.pt'
+
+
+def checkpoint_fingerprint(checkpoint_path):
+    stat = os.stat(checkpoint_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'engine': torch.backends.quantized.engine}
+
+
+def load_quantized_model(model, checkpoint_path, map_location='cpu'):
+    """
+    Returns `model` (a freshly built fp32 DraftTransformer) quantized to int8 with the weights of
+    checkpoint_path. The quantized state dict is cached next to the checkpoint (<name>.int8.pt) and
+    reused while the checkpoint is unchanged, so startup skips the fp32 load + conversion.
+    """
+    cache_path = quantized_cache_path(checkpoint_path)
+    fingerprint = checkpoint_fingerprint(checkpoint_path)
+
+    if os.path.exists(cache_path):
+        try:
+            cached = torch.load(cache_path, map_location=map_location, weights_only=True)
+            if cached.get('fingerprint') == fingerprint:
+                quantize_model_int8(model)
+                model.load_state_dict(cached['state_dict'])
+                print(f"✅ Loaded cached int8 model from {cache_path}")
+                return model
+            print("⚠️ Cached int8 model is stale, re-quantizing...")
+        except Exception as e:
+            print(f"⚠️ Could not load cached int8 model ({e}), re-quantizing...")
+
+    model.load_state_dict(torch.load(checkpoint_path, map_location='cpu', mmap=True, weights_only=True))
+    quantize_model_int8(model)
+    try:
+        torch.save({'fingerprint': fingerprint, 'state_dict': model.state_dict()}, cache_path)
+        print(f"💾 Cached int8 model at {cache_path}")
+    except OSError as e:
+        print(f"⚠️ Could not cache int8 model: {e}")
+    return model
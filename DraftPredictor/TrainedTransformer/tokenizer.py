@@ -1,14 +1,104 @@
 import json
+import re
 from typing import List, Dict
 
+# Data Dragon ids / common short forms that do not normalize to the display name.
+CHAMPION_ALIASES = {
+    'MonkeyKing': 'Wukong',
+    'KSante': "K'Sante",
+    'XinZhao': 'Xin Zhao',
+    'DrMundo': 'Dr. Mundo',
+    'AurelionSol': 'Aurelion Sol',
+    'Kaisa': "Kai'Sa",
+    'MissFortune': 'Miss Fortune',
+    'Renata': 'Renata Glasc',
+    'JarvanIV': 'Jarvan IV',
+    'LeeSin': 'Lee Sin',
+    'Reksai': "Rek'Sai",
+    'Nunu': 'Nunu & Willump',
+    'MF': 'Miss Fortune',
+    'TF': 'Twisted Fate',
+    'J4': 'Jarvan IV',
+    'Mundo': 'Dr. Mundo',
+}
+
+class ChampionResolver:
+    """
+    O(1) champion name -> token id lookup.
+    Keys are normalized (case, spaces, punctuation and apostrophes removed), so "kaisa", "Kai'Sa"
+    and "KAI SA" all hit the same entry. Aliases cover Data Dragon ids (MonkeyKing, KSante, ...).
+    A trigram index gives an optional fuzzy fallback for typos in voice/LLM-sourced names.
+    """
+    def __init__(self, vocab, aliases=CHAMPION_ALIASES, min_similarity=0.5):
+        self.min_similarity = min_similarity
+        
+        # Champion tokens only (special tokens like [PAD], STEP_1, BLUE are all upper-case)
+        self.names = {v: k for k, v in vocab.items() if k != k.upper()}
+        self.index = {self.normalize(k): v for v, k in self.names.items()}
+        for alias, target in aliases.items():
+            target_id = self.index.get(self.normalize(target))
+            if target_id is not None:
+                self.index.setdefault(self.normalize(alias), target_id)
+        
+        # Trigram -> normalized keys (for fuzzy matching)
+        self.trigram_index = {}
+        for key in self.index:
+            for gram in self._trigrams(key):
+                self.trigram_index.setdefault(gram, set()).add(key)
+
+    @staticmethod
+    def normalize(name):
+        return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+    @staticmethod
+    def _trigrams(key):
+        padded = f"  {key} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def resolve(self, name, fuzzy=False):
+        """Returns the token id for a champion name, or None."""
+        if not name:
+            return None
+        key = self.normalize(name)
+        cid = self.index.get(key)
+        if cid is None and fuzzy and key:
+            cid = self._fuzzy_lookup(key)
+        return cid
+
+    def canonical_name(self, name, fuzzy=False):
+        """Returns the vocab spelling of a champion name (e.g. 'MonkeyKing' -> 'Wukong'), or None."""
+        cid = self.resolve(name, fuzzy=fuzzy)
+        return self.names.get(cid) if cid is not None else None
+
+    def _fuzzy_lookup(self, key):
+        grams = self._trigrams(key)
+        overlap = {}
+        for gram in grams:
+            for candidate in self.trigram_index.get(gram, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+        
+        best_key, best_score = None, 0.0
+        for candidate, shared in overlap.items():
+            # Dice coefficient over trigram sets
+            score = 2.0 * shared / (len(grams) + len(self._trigrams(candidate)))
+            if score > best_score:
+                best_key, best_score = candidate, score
+        
+        if best_key is not None and best_score >= self.min_similarity:
+            return self.index[best_key]
+        return None
+
 class DraftTokenizer:
-    def __init__(self, vocab_path: str):
+    def __init__(self, vocab_path: str, class_db_path: str = None):
         with open(vocab_path, 'r') as f:
             self.vocab = json.load(f)
             
         self.id_to_token = {v: k for k, v in self.vocab.items()}
         self.pad_token_id = self.vocab.get("[PAD]", 0)
         self.unknown_token_id = self.vocab.get("CLASS_UNKNOWN", 20) # Fallback
+        
+        # Normalized / alias / fuzzy champion name lookup
+        self.resolver = ChampionResolver(self.vocab)
 
         # Mappings for categorical features
         # Action: BAN=0, PICK=1
@@ -28,6 +118,33 @@ class DraftTokenizer:
             "Tank": 5
         }
         self.num_classes = len(self.class_map)
+        
+        # [vocab, num_classes] multi-hot class table (see load_class_table)
+        self.class_table = None
+        if class_db_path:
+            self.load_class_table(class_db_path)
+
+    def load_class_table(self, class_db_path):
+        """
+        Builds the [vocab, num_classes] multi-hot class table from champion_classes.json once,
+        so class features are a single gather on champion ids (same table for training and serving).
+        Rows for special tokens / champions without classes are all zeros.
+        """
+        with open(class_db_path, 'r') as f:
+            data = json.load(f)
+        
+        table = [[0.0] * self.num_classes for _ in range(max(self.vocab.values()) + 1)]
+        for cls, champs in data.items():
+            cls_id = self.class_map.get(cls)
+            if cls_id is None:
+                continue
+            for champ in champs:
+                cid = self.resolver.resolve(champ)
+                if cid is not None:
+                    table[cid][cls_id] = 1.0
+        
+        self.class_table = table
+        return table
 
     def encode(self, context_dict, history_list, max_len=21):
         """
@@ -150,5 +267,13 @@ class DraftTokenizer:
             }
         }
 
+    def encode_for_inference(self, context_dict, history_list, max_len=21):
+        """
+        Dynamic-length encode for serving: only the real history plus the next (empty) slot,
+        instead of always padding to max_len. The model output at index len(history_list) is
+        unchanged because the encoder is causal.
+        """
+        return self.encode(context_dict, history_list, max_len=min(len(history_list) + 1, max_len))
+
     def decode(self, token_ids):
         return [self.id_to_token.get(t, "UNK") for t in token_ids]
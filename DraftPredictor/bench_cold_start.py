@@ -0,0 +1,98 @@
+"""
+Cold-start / memory benchmark for model loading.
+
+    python bench_cold_start.py [--runs 3]
+
+Each strategy runs in a fresh interpreter (cold imports, cold allocator):
+  legacy : DraftTransformer(...) + torch.load(map_location) + load_state_dict   (the old entry points)
+  mmap   : load_draft_model (memory-mapped checkpoint assigned as the parameters, assign=True)
+Reports load time, first-forward time and RSS split into private (anonymous) and file-backed pages.
+File-backed pages of a memory-mapped checkpoint are shared by every worker mapping the same file.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "TrainedTransformer/model_epoch_20.pt")
+VOCAB_PATH = os.path.join(BASE_DIR, "TrainedTransformer/vocab.json")
+
+
+def memory_mb():
+    """{'rss', 'anon', 'file'} in MB from /proc/self/status (Linux); zeros elsewhere."""
+    fields = {'VmRSS': 'rss', 'RssAnon': 'anon', 'RssFile': 'file'}
+    usage = {name: 0.0 for name in fields.values()}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    usage[fields[key]] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+    return usage
+
+
+def run_child(strategy):
+    start = time.perf_counter()
+    import torch
+    sys.path.append(os.path.join(BASE_DIR, 'TrainedTransformer'))
+    from model import DraftTransformer, load_draft_model
+    from inference_build import synthetic_inputs
+    import_s = time.perf_counter() - start
+
+    with open(VOCAB_PATH) as f:
+        vocab_size = len(json.load(f))
+    before = memory_mb()
+
+    start = time.perf_counter()
+    if strategy == 'legacy':
+        model = DraftTransformer(vocab_size, vocab_size, d_model=256, nhead=8, num_layers=6)
+        model.load_state_dict(torch.load(MODEL_PATH, map_location='cpu'))
+        model.eval()
+    else:
+        model = load_draft_model(MODEL_PATH, vocab_size, vocab_size, d_model=256, nhead=8, num_layers=6)
+    load_s = time.perf_counter() - start
+    loaded = memory_mb()
+
+    start = time.perf_counter()
+    with torch.no_grad():
+        model.predict_at(*synthetic_inputs(vocab_size, 1, 8, 'cpu'))
+    forward_s = time.perf_counter() - start
+    ready = memory_mb()
+
+    print(json.dumps({
+        'import_s': import_s, 'load_s': load_s, 'first_forward_s': forward_s,
+        'load_anon_mb': loaded['anon'] - before['anon'], 'load_file_mb': loaded['file'] - before['file'],
+        'ready_rss_mb': ready['rss'], 'ready_anon_mb': ready['anon'], 'ready_file_mb': ready['file']
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model cold-start / RSS benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", choices=["legacy", "mmap"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    print(f"Checkpoint: {MODEL_PATH} ({os.path.getsize(MODEL_PATH) / 2**20:.1f} MB), {args.runs} cold runs each\n")
+    print(f"{'strategy':8} {'import':>8} {'load':>8} {'1st fwd':>8} {'+anon':>9} {'+file':>9} {'RSS':>9} {'private':>9}")
+    for strategy in ("legacy", "mmap"):
+        runs = []
+        for _ in range(args.runs):
+            out = subprocess.run([sys.executable, __file__, "--child", strategy], capture_output=True, text=True, check=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        avg = {k: sum(r[k] for r in runs) / len(runs) for k in runs[0]}
+        print(f"{strategy:8} {avg['import_s']:7.2f}s {avg['load_s'] * 1000:6.0f}ms {avg['first_forward_s'] * 1000:6.0f}ms "
+              f"{avg['load_anon_mb']:7.1f}MB {avg['load_file_mb']:7.1f}MB {avg['ready_rss_mb']:7.1f}MB {avg['ready_anon_mb']:7.1f}MB")
+    print("\n+anon / +file: memory added by loading (private vs file-backed, shareable). private: RssAnon when ready.")
+
+
+if __name__ == "__main__":
+    main()
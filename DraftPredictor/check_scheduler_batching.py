@@ -0,0 +1,74 @@
+"""
+Concurrency check for the inference scheduler.
+
+    python check_scheduler_batching.py [--clients 8] [--steps 12]
+
+Several coaches draft at once, each with its own sessionId, calling /predict concurrently at every
+step. Their KV-session prefills / extensions and uncached forwards should be merged by the scheduler,
+so /stats must show batches of more than one request. Speculative precompute is turned off so every
+step really reaches the model.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("SPECULATIVE_PRECOMPUTE", "0")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import server
+
+
+def draft_payload(champions, step, session_id):
+    """/predict payload with the first `step` actions of DRAFT_ORDER filled from champions."""
+    slots = {('blue', 'BAN'): 'blueBans', ('red', 'BAN'): 'redBans', ('blue', 'PICK'): 'bluePicks', ('red', 'PICK'): 'redPicks'}
+    data = {
+        "sessionId": session_id,
+        "currentStepIndex": step,
+        "blueTeam": {"name": "Blue"},
+        "redTeam": {"name": "Red"},
+        "blueBans": [], "redBans": [], "bluePicks": [], "redPicks": []
+    }
+    for i in range(step):
+        data[slots[server.DRAFT_ORDER[i]]].append({"name": champions[i]})
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that concurrent /predict calls are micro-batched")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=12)
+    args = parser.parse_args()
+
+    if server.inference_scheduler is None:
+        print("❌ Scheduler is off (INFERENCE_BATCH_WINDOW_MS=0).")
+        sys.exit(1)
+
+    names = sorted(server.tokenizer.resolver.names.values())
+    drafts = [random.Random(c).sample(names, 20) for c in range(args.clients)]
+    client = server.app.test_client()
+    barrier = threading.Barrier(args.clients)
+
+    def coach(c):
+        for step in range(args.steps):
+            barrier.wait()  # every coach asks at the same time, like a live tournament day
+            response = client.post('/predict', json=draft_payload(drafts[c], step, f"coach-{c}"))
+            assert response.status_code == 200, response.get_json()
+
+    with ThreadPoolExecutor(args.clients) as pool:
+        list(pool.map(coach, range(args.clients)))
+
+    stats = client.get('/stats').get_json()['scheduler']
+    print(f"{args.clients} coaches x {args.steps} steps: {stats['requests']} scheduled requests in {stats['batches']} batches "
+          f"(avg {stats['avg_batch_size']}), batch sizes {stats['batch_size_histogram']}")
+    batched = sum(n for size, n in stats['batch_size_histogram'].items() if int(size) > 1)
+    if not batched:
+        print("❌ No batch held more than one request.")
+        sys.exit(1)
+    print(f"✅ {batched} batches merged requests from several coaches.")
+
+
+if __name__ == "__main__":
+    main()
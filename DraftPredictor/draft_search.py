@@ -0,0 +1,321 @@
+import math
+import time
+import torch
+
+# Search over the remaining steps of a draft.
+# The search only deals in champion ids and DRAFT_ORDER steps; the caller supplies a batched
+# score function that turns continuations into next-step logits (server.py wraps
+# run_model_inference_batch), so every expansion of every live beam costs one forward.
+
+
+def beam_search_draft(score_fn, draft_order, start_step, seen_ids, beam_width=8, top_n=5, branch_factor=None):
+    """
+    Beam search over draft_order[start_step:].
+
+    score_fn(continuations, seen_id_sets) -> [B, Vocab] logits for the next step of each continuation.
+        continuations: One list of (step_idx, champ_id) per beam (the steps added after the partial draft).
+        seen_id_sets: One set of unavailable ids per beam (taken champions + anything in seen_ids).
+        Unavailable ids must come back as -inf.
+    seen_ids: Ids that can never be drafted (already taken, fearless bans, special tokens).
+    branch_factor: Children kept per beam before the global cut (defaults to beam_width).
+
+    Returns up to top_n dicts {'steps': [(step_idx, champ_id), ...], 'log_prob': float, 'probability': float},
+    most likely first. Probabilities are the model's joint probability of the whole continuation.
+    """
+    branch_factor = branch_factor or beam_width
+    beams = [([], set(seen_ids), 0.0)]  # (continuation, seen ids, cumulative log-prob)
+
+    for step_idx in range(start_step, len(draft_order)):
+        logits = score_fn([b[0] for b in beams], [b[1] for b in beams])
+        log_probs = torch.log_softmax(logits.float(), dim=-1)
+
+        # Children of every beam in one topk; -inf rows/entries (no champion left) are dropped below
+        k = min(branch_factor, log_probs.size(-1))
+        child_lp, child_ids = torch.topk(log_probs, k, dim=-1)
+        scores = child_lp + torch.tensor([b[2] for b in beams], dtype=child_lp.dtype).unsqueeze(-1)
+
+        flat_scores, flat_idx = torch.topk(scores.view(-1), min(beam_width, scores.numel()))
+        next_beams = []
+        for score, idx in zip(flat_scores.tolist(), flat_idx.tolist()):
+            if score == float('-inf'):
+                break
+            parent, child = divmod(idx, k)
+            cid = child_ids[parent, child].item()
+            continuation, seen, _ = beams[parent]
+            next_beams.append((continuation + [(step_idx, cid)], seen | {cid}, score))
+        if not next_beams:
+            break
+        beams = next_beams
+
+    return [
+        {'steps': continuation, 'log_prob': score, 'probability': math.exp(score)}
+        for continuation, _, score in beams[:top_n]
+    ]
+
+
+def rollout_candidates(score_fn, draft_order, start_step, seen_ids, candidate_ids, rollouts_per_round=16,
+                       max_rollouts=64, time_budget_ms=200.0, temperature=1.0, top_responses=5, generator=None):
+    """
+    Monte Carlo value of each candidate for draft_order[start_step]: the candidate is played, then the rest of
+    the draft is sampled from the model. Rounds of len(candidate_ids) * rollouts_per_round rollouts run as ONE
+    batch per draft step (taken champions masked with a [R, Vocab] bool tensor) until max_rollouts per
+    candidate are done or the next round would overrun time_budget_ms. The first round always runs.
+
+    score_fn: Same contract as for beam_search_draft; rollouts pass empty seen sets and mask on their own.
+
+    Returns one dict per candidate, in order:
+        'rollouts': completed rollouts rooted at the candidate
+        'opponent_responses': [(champ_id, frequency), ...] for the opponent's first action after the candidate
+        'survival': fraction of rollouts rooted at OTHER candidates in which this candidate is still available
+                    at the acting side's next turn of the same action (None if there is no such turn)
+    """
+    side, action = draft_order[start_step]
+    num_candidates = len(candidate_ids)
+    opp_step = next((s for s in range(start_step + 1, len(draft_order)) if draft_order[s][0] != side), None)
+    next_turn = next((s for s in range(start_step + 1, len(draft_order)) if draft_order[s] == (side, action)), None)
+
+    candidates = torch.tensor(candidate_ids, dtype=torch.long)
+    response_counts = None
+    survived = torch.zeros(num_candidates)
+    survival_trials = torch.zeros(num_candidates)
+    done = 0
+
+    # Rounds start small and double, so a tight budget still gets a (small) first round and
+    # a round is only started when the measured cost per rollout says it fits.
+    round_size = min(4, rollouts_per_round)
+    start = time.perf_counter()
+    while done < max_rollouts:
+        per_candidate = min(round_size, max_rollouts - done)
+        if done:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms + elapsed_ms / done * per_candidate > time_budget_ms:
+                break
+        roots = candidates.repeat_interleave(per_candidate)  # [R]
+        picks, vocab_size = _sample_rollouts(score_fn, draft_order, start_step, seen_ids, roots, temperature, generator)
+
+        if opp_step is not None:
+            # One bincount over (candidate, response) pairs
+            if response_counts is None:
+                response_counts = torch.zeros((num_candidates, vocab_size), dtype=torch.long)
+            rows = torch.arange(num_candidates).repeat_interleave(per_candidate)
+            flat = rows * vocab_size + picks[:, opp_step - start_step]
+            response_counts += torch.bincount(flat, minlength=num_candidates * vocab_size).view(num_candidates, -1)
+
+        if next_turn is not None:
+            # [R, C]: candidate c taken by anyone before the acting side's next turn
+            taken = (picks[:, :next_turn - start_step].unsqueeze(-1) == candidates).any(dim=1)
+            other_root = roots.unsqueeze(-1) != candidates
+            survived += (~taken & other_root).sum(dim=0).float()
+            survival_trials += other_root.sum(dim=0).float()
+
+        done += per_candidate
+        round_size = min(round_size * 2, rollouts_per_round)
+
+    results = []
+    for c in range(num_candidates):
+        responses = []
+        if response_counts is not None:
+            freq, ids = torch.topk(response_counts[c].float() / done, top_responses)
+            responses = [(cid, f) for cid, f in zip(ids.tolist(), freq.tolist()) if f > 0]
+        survival = None
+        if next_turn is not None and survival_trials[c] > 0:
+            survival = (survived[c] / survival_trials[c]).item()
+        results.append({'rollouts': done, 'opponent_responses': responses, 'survival': survival})
+    return results
+
+
+def _sample_rollouts(score_fn, draft_order, start_step, seen_ids, roots, temperature, generator):
+    """
+    Samples the rest of the draft for every root.
+    Returns ([R, len(draft_order) - start_step] champion ids, vocab size or None if no step was sampled).
+    """
+    num_rows = roots.size(0)
+    continuations = [[(start_step, cid)] for cid in roots.tolist()]
+    picks = [roots]
+    taken = None
+    vocab_size = None
+
+    for step_idx in range(start_step + 1, len(draft_order)):
+        logits = score_fn(continuations, [()] * num_rows).float()
+        if taken is None:
+            vocab_size = logits.size(-1)
+            taken = torch.zeros_like(logits, dtype=torch.bool)
+            taken[:, list(seen_ids)] = True
+            taken.scatter_(1, roots.unsqueeze(-1), True)
+        probs = torch.softmax(logits.masked_fill(taken, float('-inf')) / temperature, dim=-1)
+        ids = torch.multinomial(probs, 1, generator=generator).squeeze(-1)
+        taken.scatter_(1, ids.unsqueeze(-1), True)
+        picks.append(ids)
+        for continuation, cid in zip(continuations, ids.tolist()):
+            continuation.append((step_idx, cid))
+
+    return torch.stack(picks, dim=1), vocab_size
+
+
+class _SearchNode:
+    __slots__ = ('step', 'continuation', 'taken', 'log_probs', 'children', 'value')
+
+    def __init__(self, step, continuation, taken):
+        self.step = step
+        self.continuation = continuation  # first path that reached this state (what the model is shown)
+        self.taken = taken
+        self.log_probs = None  # [Vocab] unmasked log-softmax of the next step, once evaluated
+        self.children = None   # [(champ_id, transposition key)] once expanded
+        self.value = None
+
+
+def _state_key(step, continuation, draft_order):
+    """Transposition key: the unordered picks / bans of each side (different orders, same state)."""
+    groups = {}
+    for step_idx, cid in continuation:
+        groups.setdefault(draft_order[step_idx], set()).add(cid)
+    return step, frozenset((slot, frozenset(ids)) for slot, ids in groups.items())
+
+
+def lookahead_search(score_fn, draft_order, start_step, seen_ids, depth=3, top_k=4, root_candidates=None,
+                     mode='expectimax', node_budget=512, time_budget_ms=150.0):
+    """
+    Depth-limited adversarial search over draft_order[start_step:start_step + depth], expanding the model's
+    top_k moves at every node. The side to move at start_step is the maximizing side.
+
+    Value of a line: the model's (unmasked) log-probability of each PICK, + for our picks and - for the
+    opponent's, so taking a champion away from the other side shows up as lost probability mass.
+    Leaves add the best pick still available to the side to move. Bans are scored through that denial only,
+    so a line that ends on a ban step is rolled forward with the likeliest ban (top-1) until the next PICK
+    step: otherwise every move of a ban phase would evaluate to 0. If the budget stops the roll early, the
+    leaf is scored for the side of that next PICK from the ban step's own distribution.
+    mode: 'expectimax' (opponent nodes weight their top_k children by the model) | 'minimax'.
+
+    The tree is expanded level by level, each level's new states scored in ONE batched score_fn call.
+    States reached through different orders share a node (transposition table keyed by the unordered
+    picks / bans per side). Expansion stops at node_budget nodes, or when scoring the next level would
+    overrun time_budget_ms (the last expanded level then falls back to static evaluation).
+
+    root_candidates: Moves to evaluate at the root (default: the model's top_k).
+    Returns ({'champ_id', 'value', 'line': [(step_idx, champ_id), ...]} per root move, best first; stats dict).
+    """
+    start = time.perf_counter()
+    stats = {'nodes': 0, 'evaluated': 0, 'transpositions': 0, 'depth': 0}
+    if start_step >= len(draft_order):
+        return [], stats
+    end_step = min(start_step + depth, len(draft_order))
+    root_side = draft_order[start_step][0]
+    table = {}
+
+    root = _SearchNode(start_step, [], frozenset(seen_ids))
+    frontier = [root]
+    expanded = []
+    level_ms_per_node = None
+
+    while frontier:
+        # Score every new state of this level in one forward
+        pending = [n for n in frontier if n.log_probs is None and n.step < len(draft_order)]
+        if pending:
+            # The root and its children are always scored; deeper levels only when they fit the budget
+            if stats['depth'] > 1:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if elapsed_ms + level_ms_per_node * len(pending) > time_budget_ms:
+                    for node in expanded:
+                        node.children = None
+                    stats['depth'] -= 1
+                    break
+            t = time.perf_counter()
+            logits = score_fn([n.continuation for n in pending], [()] * len(pending)).float()
+            log_probs = torch.log_softmax(logits, dim=-1)
+            for n, row in zip(pending, log_probs):
+                n.log_probs = row
+            level_ms_per_node = (time.perf_counter() - t) * 1000 / len(pending)
+            stats['evaluated'] += len(pending)
+
+        next_frontier = []
+        expanded = []
+        for node in frontier:
+            if node.log_probs is None or stats['nodes'] >= node_budget:
+                continue
+            # Past the horizon only ban steps are extended (one move each) up to the next PICK
+            past_horizon = node.step >= end_step
+            if past_horizon and draft_order[node.step][1] == 'PICK':
+                continue
+            if node is root and root_candidates is not None:
+                moves = [cid for cid in root_candidates if cid not in node.taken]
+            else:
+                masked = node.log_probs.clone()
+                masked[list(node.taken)] = float('-inf')
+                moves = [cid for lp, cid in zip(*torch.topk(masked, 1 if past_horizon else top_k)) if lp > float('-inf')]
+                moves = [int(cid) for cid in moves]
+            node.children = []
+            expanded.append(node)
+            for cid in moves:
+                continuation = node.continuation + [(node.step, cid)]
+                key = _state_key(node.step + 1, continuation, draft_order)
+                child = table.get(key)
+                if child is None:
+                    child = _SearchNode(node.step + 1, continuation, node.taken | {cid})
+                    table[key] = child
+                    stats['nodes'] += 1
+                    next_frontier.append(child)
+                else:
+                    stats['transpositions'] += 1
+                node.children.append((cid, key))
+        if next_frontier:
+            stats['depth'] += 1
+        frontier = next_frontier
+
+    def pick_score(node, cid):
+        side, action = draft_order[node.step]
+        if action != 'PICK':
+            return 0.0
+        return (1.0 if side == root_side else -1.0) * node.log_probs[cid].item()
+
+    def backup(node):
+        if node.value is not None:
+            return node.value
+        if node.step >= len(draft_order) or node.log_probs is None:
+            node.value = 0.0
+        elif not node.children:
+            # Static evaluation: best pick still open to the side of the next PICK
+            pick_step = next((i for i in range(node.step, len(draft_order)) if draft_order[i][1] == 'PICK'), None)
+            if pick_step is None:
+                node.value = 0.0
+            else:
+                masked = node.log_probs.clone()
+                masked[list(node.taken)] = float('-inf')
+                sign = 1.0 if draft_order[pick_step][0] == root_side else -1.0
+                node.value = sign * masked.max().item()
+        else:
+            values = [pick_score(node, cid) + backup(table[key]) for cid, key in node.children]
+            if draft_order[node.step][0] == root_side:
+                node.value = max(values)
+            elif mode == 'minimax':
+                node.value = min(values)
+            else:
+                weights = torch.softmax(torch.stack([node.log_probs[cid] for cid, _ in node.children]), dim=0)
+                node.value = float(sum(w * v for w, v in zip(weights.tolist(), values)))
+        return node.value
+
+    def best_child(node):
+        if draft_order[node.step][0] == root_side:
+            return max(node.children, key=lambda c: pick_score(node, c[0]) + backup(table[c[1]]))
+        if mode == 'minimax':
+            return min(node.children, key=lambda c: pick_score(node, c[0]) + backup(table[c[1]]))
+        return max(node.children, key=lambda c: node.log_probs[c[0]].item())  # opponent's likeliest reply
+
+    def principal_line(node):
+        line = []
+        while node.children:
+            cid, key = best_child(node)
+            line.append((node.step, cid))
+            node = table[key]
+        return line
+
+    results = []
+    for cid, key in root.children or []:
+        child = table[key]
+        results.append({
+            'champ_id': cid,
+            'value': pick_score(root, cid) + backup(child),
+            'line': [(start_step, cid)] + principal_line(child)
+        })
+    results.sort(key=lambda r: r['value'], reverse=True)
+    stats['elapsed_ms'] = (time.perf_counter() - start) * 1000
+    return results, stats
@@ -0,0 +1,158 @@
+import glob
+import os
+import re
+
+import torch
+import torch.nn.functional as F
+
+
+def resolve_checkpoints(spec, base_dir):
+    """
+    Comma-separated checkpoint paths or globs (relative to base_dir), e.g.
+    "model_epoch_1[6-9].pt,model_epoch_20.pt". Returns unique paths ordered by epoch number.
+    """
+    paths = []
+    for pattern in (p.strip() for p in spec.split(',') if p.strip()):
+        if not os.path.isabs(pattern):
+            pattern = os.path.join(base_dir, pattern)
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise FileNotFoundError(f"No checkpoint matches {pattern}")
+        paths.extend(m for m in matches if m not in paths)
+
+    def epoch(path):
+        found = re.search(r'epoch_(\d+)', os.path.basename(path))
+        return int(found.group(1)) if found else -1
+    return sorted(paths, key=epoch)
+
+
+def _linear(weight, bias):
+    """nn.Linear params of K members -> (weight [K, out, in], bias [K, 1, out]) for _apply_linear (bmm + in-place bias add)."""
+    return torch.stack(weight), torch.stack(bias).unsqueeze(1)
+
+
+class DraftEnsemble:
+    """
+    K checkpoints of the same architecture served as one model: their parameters are stacked along a
+    leading member axis and the K forwards run as ONE batched forward (members folded into the batch
+    dimension for attention, batched matmuls with fused bias for every Linear).
+    predict_at returns the members' averaged logits [B, Vocab], same contract as DraftTransformer.
+    Inference only (eval mode: dropout is skipped). torch.vmap over the eager modules was not used:
+    its SDPA has no CPU batching rule and its unfused bias adds made it slower than K separate forwards.
+    """
+    static_shapes = False
+
+    def __init__(self, models):
+        self.size = len(models)
+        members = [model.eval() for model in models]
+        embeddings = [m.embedding for m in members]
+
+        def stack(get):
+            return torch.stack([get(m).detach() for m in members])
+
+        with torch.no_grad():
+            # Embedding tables [K, rows, dim]; the class table is the same tokenizer table for every member
+            self.emb_champ = stack(lambda m: m.embedding.emb_champ.weight)
+            self.emb_action = stack(lambda m: m.embedding.emb_action.weight)
+            self.emb_team = stack(lambda m: m.embedding.emb_team.weight)
+            self.emb_pos = stack(lambda m: m.embedding.emb_pos.weight)
+            self.emb_ctx_team = stack(lambda m: m.embedding.emb_ctx_team.weight)
+            self.emb_ctx_game = stack(lambda m: m.embedding.emb_ctx_game.weight)
+            self.class_table = embeddings[0].class_table.detach()
+            self.class_proj = _linear([e.class_proj.weight for e in embeddings], [e.class_proj.bias for e in embeddings])
+            self.ctx_proj = _linear([e.ctx_proj.weight for e in embeddings], [e.ctx_proj.bias for e in embeddings])
+            self.seq_proj = _linear([e.seq_proj.weight for e in embeddings], [e.seq_proj.bias for e in embeddings])
+            self.pe = members[0].pos_encoder.pe[:, 0].detach()  # [max_len, D] (fixed sinusoids)
+
+            encoders = [m.transformer_encoder for m in members]
+            first = encoders[0].layers[0]
+            self.num_heads = first.self_attn.num_heads
+            self.activation = first.activation
+            # ReLU (the nn.TransformerEncoderLayer default) is applied in place on the fresh linear1 output
+            self.inplace_relu = first.activation is F.relu
+            self.layers = []
+            for i in range(len(encoders[0].layers)):
+                layers = [enc.layers[i] for enc in encoders]
+                self.layers.append({
+                    'in_proj': _linear([l.self_attn.in_proj_weight for l in layers], [l.self_attn.in_proj_bias for l in layers]),
+                    'out_proj': _linear([l.self_attn.out_proj.weight for l in layers], [l.self_attn.out_proj.bias for l in layers]),
+                    'linear1': _linear([l.linear1.weight for l in layers], [l.linear1.bias for l in layers]),
+                    'linear2': _linear([l.linear2.weight for l in layers], [l.linear2.bias for l in layers]),
+                    'norm1': self._norm([l.norm1 for l in layers]),
+                    'norm2': self._norm([l.norm2 for l in layers])
+                })
+            self.final_norm = self._norm([enc.norm for enc in encoders]) if encoders[0].norm is not None else None
+            self.output_head = _linear([m.output_head.weight for m in members], [m.output_head.bias for m in members])
+
+    @staticmethod
+    def _norm(norms):
+        """LayerNorm params of K members -> (weight [K, 1, D], bias [K, 1, D], eps)."""
+        return (
+            torch.stack([n.weight.detach() for n in norms]).unsqueeze(1),
+            torch.stack([n.bias.detach() for n in norms]).unsqueeze(1),
+            norms[0].eps
+        )
+
+    @staticmethod
+    def _apply_linear(x, params):
+        weight, bias = params
+        # Transposed view like F.linear; bias added in place (baddbmm first materialises the broadcast bias)
+        return torch.bmm(x, weight.transpose(1, 2)).add_(bias)
+
+    @staticmethod
+    def _apply_norm(x, params):
+        weight, bias, eps = params
+        return torch.addcmul(bias, F.layer_norm(x, x.shape[-1:], eps=eps), weight)
+
+    def member_logits(self, ctx_data, seq_data, target_idx):
+        """Per-member logits [K, B, Vocab]."""
+        champ_ids = seq_data['champ_ids']
+        batch_size, seq_len = champ_ids.shape
+        if not torch.is_tensor(target_idx):
+            target_idx = torch.full((batch_size,), int(target_idx), dtype=torch.long)
+        k = self.size
+        
+        # Embeddings: [K, B, T, dim] gathers from the stacked tables, then one batched projection each
+        class_vecs = self.class_table[champ_ids].expand(k, -1, -1, -1).reshape(k, batch_size * seq_len, -1)
+        seq_cat = torch.cat([
+            self.emb_champ[:, champ_ids],
+            self.emb_action[:, seq_data['action_ids']],
+            self.emb_team[:, seq_data['team_ids']],
+            self.emb_pos[:, seq_data['pos_ids']],
+            self._apply_linear(class_vecs, self.class_proj).view(k, batch_size, seq_len, -1)
+        ], dim=-1)
+        seq_emb = self._apply_linear(seq_cat.view(k, batch_size * seq_len, -1), self.seq_proj)
+        ctx_cat = torch.cat([
+            self.emb_ctx_team[:, ctx_data['context_blue']],
+            self.emb_ctx_team[:, ctx_data['context_red']],
+            self.emb_ctx_game[:, ctx_data['context_game']]
+        ], dim=-1)
+        ctx_emb = self._apply_linear(ctx_cat, self.ctx_proj)
+        
+        length = seq_len + 1
+        d_model = ctx_emb.size(-1)
+        x = torch.cat([ctx_emb.unsqueeze(2), seq_emb.view(k, batch_size, seq_len, d_model)], dim=2)
+        x = (x + self.pe[:length]).view(k, batch_size * length, d_model)
+        
+        head_dim = d_model // self.num_heads
+        for layer in self.layers:
+            # Attention over [K*B, heads, T+1, head_dim]: the members are just more batch rows
+            q, kk, v = self._apply_linear(x, layer['in_proj']).chunk(3, dim=-1)
+            q, kk, v = [t.reshape(k * batch_size, length, self.num_heads, head_dim).transpose(1, 2) for t in (q, kk, v)]
+            attn = F.scaled_dot_product_attention(q, kk, v, is_causal=True)
+            attn = attn.transpose(1, 2).reshape(k, batch_size * length, d_model)
+            x = self._apply_norm(x + self._apply_linear(attn, layer['out_proj']), layer['norm1'])
+            hidden = self._apply_linear(x, layer['linear1'])
+            hidden = hidden.relu_() if self.inplace_relu else self.activation(hidden)
+            ff = self._apply_linear(hidden, layer['linear2'])
+            x = self._apply_norm(x + ff, layer['norm2'])
+        if self.final_norm is not None:
+            x = self._apply_norm(x, self.final_norm)
+        
+        # Only each row's target position goes through the output head
+        rows = torch.arange(batch_size, device=x.device)
+        hidden = x.view(k, batch_size, length, d_model)[:, rows, target_idx.to(x.device)]
+        return self._apply_linear(hidden, self.output_head)
+
+    def predict_at(self, ctx_data, seq_data, target_idx):
+        return self.member_logits(ctx_data, seq_data, target_idx).mean(dim=0)
@@ -0,0 +1,160 @@
+"""
+Exports the served DraftTransformer to ONNX and checks the onnxruntime backend against PyTorch.
+
+    python export_onnx.py                       # writes TrainedTransformer/model_epoch_20.onnx
+    python export_onnx.py --output model.onnx --skip-check
+
+Graph inputs: context_blue/red/game [B], champ/action/team/pos ids [B, T], target_idx [B] and the
+class multi-hot table class_table [Vocab, num_classes] (float), with dynamic batch, sequence and vocab
+axes. Output: logits [B, Vocab] at target_idx (same as predict_at). The class table is an input rather
+than a baked-in constant, so an edit to champion_classes.json does not need a re-export.
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import warnings
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'TrainedTransformer'))
+
+from bundle import open_bundle
+from model import DraftInferenceModule
+from quantization import QuantizableEncoder
+from inference_build import synthetic_inputs
+from onnx_predictor import OnnxDraftPredictor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "TrainedTransformer/model_epoch_20.pt")
+VOCAB_PATH = os.path.join(BASE_DIR, "TrainedTransformer/vocab.json")
+CLASS_DB_PATH = os.path.join(BASE_DIR, "..", "champion_classes.json")
+BUNDLE_PATH = os.getenv("MODEL_BUNDLE", os.path.join(BASE_DIR, "TrainedTransformer/draft_bundle"))
+TEST_DATA_PATH = os.path.join(BASE_DIR, "..", "Tansformer_Drafting/Data/processed/test_games.json")
+
+SEQ_INPUTS = ('champ_ids', 'action_ids', 'team_ids', 'pos_ids')
+
+
+class ClassTableInferenceModule(nn.Module):
+    """DraftInferenceModule with the class multi-hot table as an extra graph input instead of the model buffer."""
+    INPUT_NAMES = DraftInferenceModule.INPUT_NAMES + ('class_table',)
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, context_blue, context_red, context_game, champ_ids, action_ids, team_ids, pos_ids, target_idx,
+                class_table):
+        ctx_data = {'context_blue': context_blue, 'context_red': context_red, 'context_game': context_game}
+        seq_data = {'champ_ids': champ_ids, 'action_ids': action_ids, 'team_ids': team_ids, 'pos_ids': pos_ids,
+                    'class_vecs': class_table[champ_ids]}
+        return self.model.predict_at(ctx_data, seq_data, target_idx)
+
+
+def export_onnx(model, output_path, vocab_size, opset=17):
+    """
+    Writes `model` (eval) to output_path. nn.MultiheadAttention bakes the sequence length into its
+    reshapes when traced, so the encoder is swapped for the equivalent Linear-projection encoder first.
+    """
+    export_model = copy.deepcopy(model).eval()
+    export_model.transformer_encoder = QuantizableEncoder(export_model.transformer_encoder)
+    module = ClassTableInferenceModule(export_model).eval()
+
+    ctx_data, seq_data, target_idx = synthetic_inputs(vocab_size, 2, 8, 'cpu')
+    class_table = export_model.embedding.class_table.clone()
+    dynamic_axes = {name: {0: 'batch'} for name in DraftInferenceModule.INPUT_NAMES}
+    dynamic_axes.update({name: {0: 'batch', 1: 'seq'} for name in SEQ_INPUTS})
+    dynamic_axes['class_table'] = {0: 'vocab'}
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    # The causal-mask crop branch is constant for draft lengths (<= max_seq_len)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', torch.jit.TracerWarning)
+        torch.onnx.export(
+            module,
+            (*ctx_data.values(), *seq_data.values(), target_idx, class_table),
+            output_path,
+            input_names=list(ClassTableInferenceModule.INPUT_NAMES),
+            output_names=['logits'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            dynamo=False
+        )
+
+
+def encode_game(tokenizer, game):
+    """One row per draft step: the full draft (causal, so later steps are never seen) scored at each step."""
+    draft = game['draft'][:20]
+    encoded = tokenizer.encode({}, draft, max_len=len(draft) + 1)
+    ctx, seq = encoded['context'], encoded['sequence']
+    n = len(draft)
+    ctx_data = {
+        'context_blue': torch.tensor([ctx['blue_team_id']] * n),
+        'context_red': torch.tensor([ctx['red_team_id']] * n),
+        'context_game': torch.tensor([ctx['game_num']] * n)
+    }
+    seq_data = {
+        'champ_ids': torch.tensor([seq['champion_ids']] * n),
+        'action_ids': torch.tensor([seq['action_ids']] * n),
+        'team_ids': torch.tensor([seq['team_ids']] * n),
+        'pos_ids': torch.tensor([seq['position_ids']] * n)
+    }
+    return ctx_data, seq_data, torch.arange(n)
+
+
+def check_topk(model, predictor, tokenizer, games, k=5):
+    """Compares the top-k (ids and order) of both backends at every step of every game."""
+    total, mismatches, max_diff = 0, 0, 0.0
+    with torch.no_grad():
+        for game in games:
+            ctx_data, seq_data, target_idx = encode_game(tokenizer, game)
+            expected = model.predict_at(ctx_data, seq_data, target_idx)
+            actual = torch.from_numpy(predictor.predict_at(ctx_data, seq_data, target_idx))
+            max_diff = max(max_diff, (expected - actual).abs().max().item())
+            same = (expected.topk(k, dim=-1).indices == actual.topk(k, dim=-1).indices).all(dim=-1)
+            mismatches += (~same).sum().item()
+            total += same.numel()
+    return total, mismatches, max_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the draft model to ONNX")
+    parser.add_argument("--bundle", default=BUNDLE_PATH, help="Model bundle (used instead of --checkpoint when present)")
+    parser.add_argument("--checkpoint", default=MODEL_PATH)
+    parser.add_argument("--output", default=os.path.splitext(MODEL_PATH)[0] + ".onnx")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--test-data", default=TEST_DATA_PATH)
+    parser.add_argument("--skip-check", action="store_true")
+    args = parser.parse_args()
+
+    bundle = open_bundle(args.bundle, args.checkpoint, VOCAB_PATH, CLASS_DB_PATH)
+    tokenizer = bundle.tokenizer
+    vocab_size = len(tokenizer.vocab)
+    model = bundle.model
+
+    export_onnx(model, args.output, vocab_size, opset=args.opset)
+    print(f"✅ Exported ONNX model to {args.output}")
+
+    if args.skip_check:
+        return
+    if not os.path.exists(args.test_data):
+        print(f"⚠️ Test split not found at {args.test_data}, skipping parity check.")
+        return
+
+    with open(args.test_data, 'r') as f:
+        games = json.load(f)
+    predictor = OnnxDraftPredictor(args.output, model.embedding.class_table.numpy())
+    total, mismatches, max_diff = check_topk(model, predictor, tokenizer, games)
+    print(f"📊 Top-5 parity on {len(games)} test games ({total} steps): "
+          f"{total - mismatches}/{total} identical, max |logit diff| = {max_diff:.2e}")
+    if mismatches:
+        print("❌ onnxruntime and PyTorch disagree on the top-5.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import time
+import warnings
+
+import torch
+
+from model import DraftInferenceModule
+
+# Sequence-length buckets batched inference groups rows into (static-shape builds pad to these)
+LENGTH_BUCKETS = (4, 8, 12, 16, 21)
+
+
+class CompiledPredictor:
+    """
+    predict_at-compatible front for a traced / torch.compile'd DraftInferenceModule.
+    static_shapes=True asks callers to pad sequences to fixed length buckets (avoids recompiles).
+    """
+    def __init__(self, module, mode, static_shapes=False):
+        self.module = module
+        self.mode = mode
+        self.static_shapes = static_shapes
+
+    def predict_at(self, ctx_data, seq_data, target_idx):
+        return self.module(
+            ctx_data['context_blue'], ctx_data['context_red'], ctx_data['context_game'],
+            seq_data['champ_ids'], seq_data['action_ids'], seq_data['team_ids'], seq_data['pos_ids'],
+            target_idx.to(seq_data['champ_ids'].device)
+        )
+
+
+def synthetic_inputs(vocab_size, batch_size, seq_len, device, seed=0):
+    """Random-but-valid draft inputs for tracing, warmup and parity checks."""
+    gen = torch.Generator().manual_seed(seed + batch_size * 100 + seq_len)
+    ctx_data = {
+        'context_blue': torch.randint(0, vocab_size, (batch_size,), generator=gen).to(device),
+        'context_red': torch.randint(0, vocab_size, (batch_size,), generator=gen).to(device),
+        'context_game': torch.randint(1, 6, (batch_size,), generator=gen).to(device)
+    }
+    seq_data = {
+        'champ_ids': torch.randint(1, vocab_size, (batch_size, seq_len), generator=gen).to(device),
+        'action_ids': torch.randint(0, 2, (batch_size, seq_len), generator=gen).to(device),
+        'team_ids': torch.randint(0, 2, (batch_size, seq_len), generator=gen).to(device),
+        'pos_ids': torch.arange(1, seq_len + 1).repeat(batch_size, 1).to(device)
+    }
+    target_idx = torch.randint(0, seq_len, (batch_size,), generator=gen)
+    return ctx_data, seq_data, target_idx
+
+
+def build_inference_model(model, mode, vocab_size, device, warmup_shapes, atol=1e-4):
+    """
+    Produces the serving predictor for `mode`:
+      'none'    -> the eager model
+      'trace'   -> torch.jit.trace + freeze of the embedding + encoder + head (dynamic batch / length)
+      'compile' -> torch.compile (sequences padded to static length buckets)
+    The result is warmed up on synthetic drafts for every (batch, length) in warmup_shapes and
+    checked against eager; any failure or mismatch above atol falls back to the eager model.
+    """
+    if mode in (None, '', 'none'):
+        return model
+
+    module = DraftInferenceModule(model).eval()
+    start = time.perf_counter()
+    try:
+        with torch.no_grad():
+            if mode == 'trace':
+                ctx_data, seq_data, target_idx = synthetic_inputs(vocab_size, 2, 8, device)
+                example = (*ctx_data.values(), *seq_data.values(), target_idx.to(device))
+                # The causal-mask crop branch is constant for serving lengths (<= max_seq_len)
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', torch.jit.TracerWarning)
+                    traced = torch.jit.trace(module, example, check_trace=False)
+                predictor = CompiledPredictor(torch.jit.freeze(traced), mode)
+            elif mode == 'compile':
+                predictor = CompiledPredictor(torch.compile(module), mode, static_shapes=True)
+            else:
+                raise ValueError(f"Unknown inference build mode: {mode}")
+
+            # Warmup (pays lazy-init / compilation costs now) + parity against eager
+            max_diff = 0.0
+            for batch_size, seq_len in warmup_shapes:
+                ctx_data, seq_data, target_idx = synthetic_inputs(vocab_size, batch_size, seq_len, device)
+                expected = model.predict_at(ctx_data, seq_data, target_idx)
+                actual = predictor.predict_at(ctx_data, seq_data, target_idx)
+                max_diff = max(max_diff, (expected - actual).abs().max().item())
+            if max_diff > atol:
+                raise RuntimeError(f"parity check failed (max |diff| = {max_diff:.2e} > {atol:.0e})")
+    except Exception as e:
+        print(f"⚠️ Inference build '{mode}' unavailable, serving eager model: {e}")
+        return model
+
+    print(f"✅ Inference build '{mode}' ready in {time.perf_counter() - start:.1f}s "
+          f"({len(warmup_shapes)} warmup shapes, max |diff| vs eager = {max_diff:.2e})")
+    return predictor
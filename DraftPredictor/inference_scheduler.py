@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class InferenceScheduler:
+    """
+    Cross-request micro-batching in front of the model.
+
+    Request threads submit work and block on a Future; a single worker thread collects
+    pending requests for up to `window_ms` (or until `max_batch_size` requests are queued),
+    runs them as ONE batched call of `batch_fn`, and hands each request its own result.
+
+    batch_fn(items) -> results must return one result per item, in order. It runs on the
+    worker thread, so it must set up its own thread-local state (e.g. torch.no_grad()).
+    """
+
+    def __init__(self, batch_fn, window_ms=2.0, max_batch_size=32):
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+
+        self.requests = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.batch_size_hist = {}   # batch size -> number of batches
+        self.queue_depth_hist = {}  # requests still queued at dispatch -> count
+
+        self._worker = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """Queues one request; returns a Future resolved with its result."""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def run(self, item):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(item).result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._record(len(batch), self._queue.qsize())
+
+            try:
+                results = self.batch_fn([item for item, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def _record(self, batch_size, queue_depth):
+        with self._stats_lock:
+            self.requests += batch_size
+            self.batches += 1
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth + batch_size)
+            self.batch_size_hist[batch_size] = self.batch_size_hist.get(batch_size, 0) + 1
+            self.queue_depth_hist[queue_depth] = self.queue_depth_hist.get(queue_depth, 0) + 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "window_ms": self.window * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "batch_size_histogram": dict(sorted(self.batch_size_hist.items())),
+                "queue_depth_histogram": dict(sorted(self.queue_depth_hist.items()))
+            }
@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+
+
+class LogitsCache:
+    """
+    Thread-safe LRU cache of raw (unscaled, unmasked) target logits keyed by draft prefix.
+
+    Keys are the canonical encoded draft: (context ids, per-step token tuple). Boosts, the
+    transformer_weight scale and seen-masking are applied by the caller AFTER the lookup,
+    so a single entry serves every strategy variant of the same draft state.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, logits):
+        """Stores a [Vocab] logits tensor. The tensor must not be modified afterwards."""
+        with self._lock:
+            self._entries[key] = logits
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,36 @@
+import numpy as np
+import onnxruntime as ort
+
+
+class OnnxDraftPredictor:
+    """
+    onnxruntime backend for the draft model exported by export_onnx.py.
+    Same predict_at(ctx_data, seq_data, target_idx) contract as DraftTransformer, but takes anything
+    numpy can read (arrays or CPU tensors) and returns a numpy [B, Vocab] array. This module does not
+    import torch, but server.py does (INFERENCE_BACKEND=onnx only replaces the forward pass).
+
+    class_table: [vocab, num_classes] multi-hot (e.g. DraftTokenizer.class_table), fed to the graph on
+    every call, so the export follows champion_classes.json without being re-exported.
+    """
+    static_shapes = False
+
+    def __init__(self, onnx_path, class_table, num_threads=0):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        if 'class_table' not in self.input_names:
+            raise ValueError(f"{onnx_path} has the class table baked in (older export); re-run export_onnx.py")
+        self.class_table = np.asarray(class_table, dtype=np.float32)
+
+    def predict_at(self, ctx_data, seq_data, target_idx):
+        feeds = {**ctx_data, **seq_data}
+        batch_size = len(feeds['champ_ids'])
+        if np.ndim(target_idx) == 0:
+            target_idx = np.full((batch_size,), int(target_idx))
+        feeds['target_idx'] = target_idx
+        inputs = {name: np.asarray(feeds[name], dtype=np.int64) for name in self.input_names if name != 'class_table'}
+        inputs['class_table'] = self.class_table
+        return self.session.run(None, inputs)[0]
@@ -4,14 +4,26 @@ import torch
 import os
 import sys
 import json
+import argparse
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
 from dotenv import load_dotenv
 
 # Add current directory to path
 sys.path.append(os.path.dirname(__file__))
 sys.path.append(os.path.join(os.path.dirname(__file__), 'TrainedTransformer'))
 
-from tokenizer import DraftTokenizer
-from model import DraftTransformer
+from bundle import open_bundle
+from model import DraftKVCache
+from quantization import load_quantized_model
+from logits_cache import LogitsCache
+from inference_scheduler import InferenceScheduler
+from speculative import SpeculativePrecompute, history_key
+from inference_build import build_inference_model, synthetic_inputs, LENGTH_BUCKETS
+from ensemble import DraftEnsemble, resolve_checkpoints
+from draft_search import beam_search_draft, rollout_candidates, lookahead_search
+from constraints import build_seen_index, build_boost_tensor, apply_seen_mask_, cumulative_seen_mask
 
 app = Flask(__name__)
 CORS(app)
@@ -32,12 +44,76 @@ else:
 MODEL_PATH = os.path.join(BASE_DIR, "TrainedTransformer/model_epoch_20.pt")
 VOCAB_PATH = os.path.join(BASE_DIR, "TrainedTransformer/vocab.json")
 CLASS_DB_PATH = os.path.join(BASE_DIR, "TrainedTransformer/champion_classes.json")
+if not os.path.exists(CLASS_DB_PATH):
+    # Same class DB the training data was enriched with
+    CLASS_DB_PATH = os.path.join(BASE_DIR, "..", "champion_classes.json")
+
+# Self-describing model bundle (weights + vocab + class DB + architecture, see bundle.py).
+# Without one, the loose files above are used with the default architecture.
+MODEL_BUNDLE_PATH = os.getenv("MODEL_BUNDLE", os.path.join(BASE_DIR, "TrainedTransformer/draft_bundle"))
+
+# Max number of draft prefixes whose raw logits are kept in memory
+LOGITS_CACHE_SIZE = int(os.getenv("LOGITS_CACHE_SIZE", "4096"))
+
+# Cross-request micro-batching: full forwards from concurrent requests are collected for up to
+# INFERENCE_BATCH_WINDOW_MS (or INFERENCE_MAX_BATCH requests) and run as one batch. 0 disables it.
+INFERENCE_BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "2"))
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "32"))
+
+# Inference build used for full forwards: none (eager) | trace (TorchScript) | compile (torch.compile).
+# It serves the bucketed path (sessionless /predict, lookahead, rollouts, completion, speculation);
+# KV-cached draft sessions and /draft/score replay always run the eager model.
+INFERENCE_BUILD = os.getenv("INFERENCE_BUILD", "trace")
+
+# Inference backend: torch | onnx (onnxruntime over the graph written by export_onnx.py).
+# The onnx backend never loads the PyTorch weights; draft sessions (KV cache) are torch-only.
+# Only the model forward moves to onnxruntime: the server still imports torch for encoding, masking,
+# caching and search, so per-worker import time and memory stay the same (see README_AI_ARCH.md).
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", os.path.join(BASE_DIR, "TrainedTransformer/model_epoch_20.onnx"))
+
+# Checkpoint ensemble: comma-separated checkpoints / globs next to the served weights
+# (e.g. "model_epoch_1[6-9].pt,model_epoch_20.pt"). All members run in one stacked-weight forward and
+# their logits are averaged. Empty = single model. `python test_ensemble.py` checks the stacked forward
+# against each checkpoint's own predict_at.
+ENSEMBLE_CHECKPOINTS = os.getenv("ENSEMBLE_CHECKPOINTS", "")
+
+# Speculative precompute: after each /predict, a background worker warms the logits cache for the
+# likely next states (each recommendation + each simulated opponent response). Its chunks never overlap
+# a foreground request (a request arriving mid-chunk waits for at most SPECULATIVE_CHUNK histories).
+# 0 disables it.
+SPECULATIVE_PRECOMPUTE = os.getenv("SPECULATIVE_PRECOMPUTE", "1") != "0"
+SPECULATIVE_CHUNK = int(os.getenv("SPECULATIVE_CHUNK", "8"))
+
+# Monte Carlo lookahead in /predict: for each recommendation, up to ROLLOUTS_PER_CANDIDATE full draft
+# continuations are sampled within ROLLOUT_BUDGET_MS (pick survival + opponent responses). 0 disables it.
+ROLLOUT_BUDGET_MS = float(os.getenv("ROLLOUT_BUDGET_MS", "0"))
+ROLLOUTS_PER_CANDIDATE = int(os.getenv("ROLLOUTS_PER_CANDIDATE", "32"))
+
+# Depth-N adversarial lookahead in /predict (draft_search.lookahead_search over the model's top-k moves).
+# Capped by a node budget and a latency budget so it is safe on the request path. Depth 0 disables it.
+LOOKAHEAD_DEPTH = int(os.getenv("LOOKAHEAD_DEPTH", "0"))
+LOOKAHEAD_TOP_K = int(os.getenv("LOOKAHEAD_TOP_K", "4"))
+LOOKAHEAD_MODE = os.getenv("LOOKAHEAD_MODE", "expectimax")  # expectimax | minimax
+LOOKAHEAD_NODE_BUDGET = int(os.getenv("LOOKAHEAD_NODE_BUDGET", "512"))
+LOOKAHEAD_LATENCY_MS = float(os.getenv("LOOKAHEAD_LATENCY_MS", "150"))
+
+# `python server.py --quantize int8` (or QUANTIZE=int8) serves a dynamically quantized model on CPU.
+# The quantized weights are cached next to the checkpoint (model_epoch_20.int8.pt).
+arg_parser = argparse.ArgumentParser(add_help=False)
+arg_parser.add_argument("--quantize", choices=["none", "int8"], default=os.getenv("QUANTIZE", "none"))
+SERVER_ARGS, _ = arg_parser.parse_known_args()
+QUANTIZE = SERVER_ARGS.quantize
 
 DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'mps' if torch.backends.mps.is_available() else 'cpu')
 
-model = None
+model = None  # PyTorch model (None with the onnx backend)
+inference_model = None  # Eager model, compiled predictor or onnxruntime predictor exposing predict_at
 tokenizer = None
 champ_class_map = {}
+logits_cache = LogitsCache(LOGITS_CACHE_SIZE)
+inference_scheduler = None
+speculator = None
 
 # Standard Draft Order (matches lib/draft/types.ts and inference.py logic)
 DRAFT_ORDER = [
@@ -65,28 +141,88 @@ def load_champion_classes(path):
             mapping[c_upper].append(cls)
     return mapping
 
+# Batched inference groups rows into LENGTH_BUCKETS (inference_build.py). Each forward is cropped to the
+# longest row of its bucket, so early-draft rows are never padded up to the full 21 steps.
+def bucket_for_length(history_len):
+    for bucket in LENGTH_BUCKETS:
+        if history_len + 1 <= bucket:
+            return bucket
+    return LENGTH_BUCKETS[-1]
+
+def warmup_model(vocab_size):
+    """Runs synthetic drafts through every serving path so the first real requests don't pay lazy-init costs."""
+    with torch.no_grad():
+        for seq_len in LENGTH_BUCKETS:
+            for batch_size in (1, 5):
+                ctx_data, seq_data, target_idx = synthetic_inputs(vocab_size, batch_size, seq_len, DEVICE)
+                inference_model.predict_at(ctx_data, seq_data, target_idx)
+        if model is None:
+            return
+        # Incremental (KV-cached) path: prefill + one-step extension
+        ctx_data, seq_data, _ = synthetic_inputs(vocab_size, 1, 2, DEVICE)
+        _, cache = model.forward_incremental(ctx_data, {k: v[:, :1] for k, v in seq_data.items()}, last_only=True)
+        model.forward_incremental(None, {k: v[:, 1:] for k, v in seq_data.items()}, cache, last_only=True)
+
 def init_resources():
-    global model, tokenizer, champ_class_map
+    global model, inference_model, tokenizer, champ_class_map
     
     print(f"Server initializing on {DEVICE}...")
     
-    if not os.path.exists(MODEL_PATH) or not os.path.exists(VOCAB_PATH):
+    bundle = open_bundle(MODEL_BUNDLE_PATH, MODEL_PATH, VOCAB_PATH, CLASS_DB_PATH, device=DEVICE)
+    if not bundle.has_weights or not os.path.exists(bundle.vocab_path):
         print("CRITICAL: Missing model or vocab files.")
         sys.exit(1)
         
-    tokenizer = DraftTokenizer(VOCAB_PATH)
-    champ_class_map = load_champion_classes(CLASS_DB_PATH)
+    tokenizer = bundle.tokenizer
+    champ_class_map = load_champion_classes(bundle.class_db_path or CLASS_DB_PATH)
     
     vocab_size = len(tokenizer.vocab)
-    model = DraftTransformer(vocab_size, vocab_size, d_model=256, nhead=8, num_layers=6).to(DEVICE)
+    warmup_shapes = [(b, t) for t in LENGTH_BUCKETS for b in (1, 5)]
+    
+    if INFERENCE_BACKEND == "onnx":
+        if os.path.exists(ONNX_MODEL_PATH):
+            from onnx_predictor import OnnxDraftPredictor
+            class_table = tokenizer.class_table
+            if class_table is None:
+                class_table = [[0.0] * tokenizer.num_classes for _ in range(vocab_size)]
+            inference_model = OnnxDraftPredictor(ONNX_MODEL_PATH, class_table)
+            warmup_model(vocab_size)
+            print(f"✅ ONNX model loaded successfully ({ONNX_MODEL_PATH}).")
+            return
+        print(f"⚠️ ONNX model not found at {ONNX_MODEL_PATH} (run export_onnx.py), using PyTorch.")
+    
+    if ENSEMBLE_CHECKPOINTS and QUANTIZE == "none":
+        try:
+            paths = resolve_checkpoints(ENSEMBLE_CHECKPOINTS, os.path.dirname(bundle.weights_path))
+            inference_model = DraftEnsemble([bundle.model_from_checkpoint(p) for p in paths])
+        except Exception as e:
+            print(f"❌ Failed to load ensemble: {e}")
+            sys.exit(1)
+        # KV-cached draft sessions are single-model (model stays None): ensemble requests take the batched path
+        warmup_model(vocab_size)
+        print(f"✅ Ensemble of {inference_model.size} checkpoints ready: {', '.join(os.path.basename(p) for p in paths)}")
+        return
     
     try:
-        model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
+        if QUANTIZE == "int8" and DEVICE.type == "cpu":
+            model = load_quantized_model(bundle.build_model(), bundle.weights_path, map_location=DEVICE)
+            # Class features are gathered on-device from the [vocab, 6] table
+            if tokenizer.class_table is not None:
+                model.set_class_table(tokenizer.class_table)
+        else:
+            if QUANTIZE != "none":
+                print(f"⚠️ --quantize {QUANTIZE} is CPU-only, serving fp32 on {DEVICE}.")
+            # Memory-mapped weights, assigned without a copy (shared across forked workers); class table set
+            model = bundle.model
         model.eval()
-        print("✅ Model loaded successfully.")
+        print(f"✅ Model loaded successfully ({'int8' if QUANTIZE == 'int8' and DEVICE.type == 'cpu' else 'fp32'}).")
     except Exception as e:
         print(f"❌ Failed to load model: {e}")
         sys.exit(1)
+    
+    # Compiled inference artifact (parity-checked against eager) + warmup before reporting ready
+    inference_model = build_inference_model(model, INFERENCE_BUILD, vocab_size, DEVICE, warmup_shapes)
+    warmup_model(vocab_size)
 
 import google.generativeai as genai
 import requests
@@ -546,63 +682,341 @@ strategy_manager = StrategyManager()
 # Initialize immediately
 init_resources()
 
-# Helper function to run model inference on a given history
-def run_model_inference(context_dict, history_list, seen_ids, strategy_boost_map=None, transformer_weight=1.0):
+def build_model_inputs(context_dict, history_lists):
     """
-    Runs model inference and returns logits for the target step.
-    strategy_boost_map: Dict of {champ_id: boost_value} to apply.
-    transformer_weight: Scale factor for raw logits (Cross-Fade logic).
+    Encodes one or more draft histories (sharing the same context) into a
+    single batch of model inputs. Returns (ctx_inputs, seq_inputs) with B = len(history_lists).
+    Sequences are only as long as the longest history + the next slot (dynamic length).
     """
-    encoded = tokenizer.encode(context_dict, history_list, max_len=21)
-    
-    ctx_data = encoded['context']
-    seq_data = encoded['sequence']
+    batch_size = len(history_lists)
+    seq_len = min(max(len(h) for h in history_lists) + 1, 21)
+    encoded_list = [tokenizer.encode(context_dict, h, max_len=seq_len) for h in history_lists]
+    ctx_data = encoded_list[0]['context']
     
     ctx_inputs = {
-        'context_blue': torch.tensor([ctx_data['blue_team_id']]).to(DEVICE),
-        'context_red': torch.tensor([ctx_data['red_team_id']]).to(DEVICE),
-        'context_game': torch.tensor([ctx_data['game_num']]).to(DEVICE)
+        'context_blue': torch.tensor([ctx_data['blue_team_id']] * batch_size).to(DEVICE),
+        'context_red': torch.tensor([ctx_data['red_team_id']] * batch_size).to(DEVICE),
+        'context_game': torch.tensor([ctx_data['game_num']] * batch_size).to(DEVICE)
     }
     
-    class_ids_list = seq_data['class_ids_list']
-    num_classes = 6
-    class_tensor = torch.zeros((1, len(class_ids_list), num_classes), dtype=torch.float).to(DEVICE)
-    for t, c_ids in enumerate(class_ids_list):
-        for cid in c_ids:
-            if 0 <= cid < num_classes:
-                class_tensor[0, t, cid] = 1.0
-                
+    # class_vecs is omitted: the model gathers it from its class table by champ_ids
     seq_inputs = {
-        'champ_ids': torch.tensor([seq_data['champion_ids']]).to(DEVICE),
-        'action_ids': torch.tensor([seq_data['action_ids']]).to(DEVICE),
-        'team_ids': torch.tensor([seq_data['team_ids']]).to(DEVICE),
-        'pos_ids': torch.tensor([seq_data['position_ids']]).to(DEVICE),
-        'class_vecs': class_tensor
+        'champ_ids': torch.tensor([e['sequence']['champion_ids'] for e in encoded_list]).to(DEVICE),
+        'action_ids': torch.tensor([e['sequence']['action_ids'] for e in encoded_list]).to(DEVICE),
+        'team_ids': torch.tensor([e['sequence']['team_ids'] for e in encoded_list]).to(DEVICE),
+        'pos_ids': torch.tensor([e['sequence']['position_ids'] for e in encoded_list]).to(DEVICE)
     }
+    return ctx_inputs, seq_inputs
+
+# -------------------------------------------------------------------
+# Incremental Draft Sessions (KV-Cached Decoding)
+# -------------------------------------------------------------------
+
+# A live draft only appends one step per /predict, so each session keeps the
+# per-layer key/value cache of the tokens it has already encoded and extends it.
+MAX_DRAFT_SESSIONS = 64
+draft_sessions = OrderedDict()  # session_key -> {'ctx_key', 'tokens', 'cache', 'last_logits'}
+draft_sessions_lock = threading.Lock()
+
+def get_session_key(data):
+    """
+    The client's sessionId, or None (no KV session). Keying on the matchup instead would make
+    concurrent drafts between the same teams evict and re-prefill each other's cache.
+    """
+    return data.get('sessionId') or None
+
+def encoded_step_keys(seq_inputs, row, length):
+    """
+    Hashable per-step token keys for one row of encoded inputs (used to validate cached prefixes).
+    Class features are a function of the champion id, so they need no key component.
+    """
+    return tuple(zip(
+        seq_inputs['champ_ids'][row, :length].tolist(),
+        seq_inputs['action_ids'][row, :length].tolist(),
+        seq_inputs['team_ids'][row, :length].tolist(),
+        seq_inputs['pos_ids'][row, :length].tolist()
+    ))
+
+def run_session_inference(session_key, ctx_inputs, seq_inputs, history_len):
+    """
+    Returns raw target logits [B, Vocab] for a batch of equal-length histories by extending the
+    session's KV cache with only the steps it has not seen yet.
+    B=1 calls advance the session; B>1 calls (lookahead branches) share it read-only.
+    """
+    batch_size = seq_inputs['champ_ids'].size(0)
+    ctx_key = tuple(ctx_inputs[k][0].item() for k in ('context_blue', 'context_red', 'context_game'))
+    row_tokens = [encoded_step_keys(seq_inputs, b, history_len) for b in range(batch_size)]
+    
+    # Longest prefix shared by every row
+    common_len = 0
+    while common_len < history_len and all(r[common_len] == row_tokens[0][common_len] for r in row_tokens):
+        common_len += 1
+    
+    with draft_sessions_lock:
+        session = draft_sessions.get(session_key)
+        if session is not None:
+            draft_sessions.move_to_end(session_key)
+    
+    past_len = len(session['tokens']) if session else -1
+    if session is None or session['ctx_key'] != ctx_key or past_len > common_len \
+            or session['tokens'] != row_tokens[0][:past_len]:
+        # Cold start / diverged draft: prefill Context + shared prefix once
+        prefix = {k: v[:1, :common_len] for k, v in seq_inputs.items()}
+        first_ctx = {k: v[:1] for k, v in ctx_inputs.items()}
+        prefill_logits, cache = run_incremental(first_ctx, prefix, None)
+        session = {
+            'ctx_key': ctx_key,
+            'tokens': row_tokens[0][:common_len],
+            'cache': cache,
+            'last_logits': prefill_logits
+        }
+        past_len = common_len
+        store_session = True
+    else:
+        store_session = False
+    
+    if past_len == history_len:
+        target_logits = session['last_logits'].expand(batch_size, -1)
+    else:
+        new_steps = {k: v[:, past_len:history_len] for k, v in seq_inputs.items()}
+        target_logits, cache = run_incremental(None, new_steps, session['cache'])
+        if batch_size == 1:
+            session = {
+                'ctx_key': ctx_key,
+                'tokens': row_tokens[0],
+                'cache': cache,
+                'last_logits': target_logits
+            }
+            store_session = True
+    
+    if store_session:
+        with draft_sessions_lock:
+            draft_sessions[session_key] = session
+            draft_sessions.move_to_end(session_key)
+            while len(draft_sessions) > MAX_DRAFT_SESSIONS:
+                draft_sessions.popitem(last=False)
+    
+    return target_logits
+
+def run_incremental_group(items):
+    """
+    One batched forward_incremental for session work of several requests.
+    items: (ctx_inputs [b] or None, new_steps {k: [b, n]}, cache) with either cache=None for every item
+    (prefill, ctx given) or B=1 caches of one common length (extension).
+    Rows are right-padded to the longest n (causal, so padding never reaches a real position).
+    Returns one (target logits [b, Vocab], DraftKVCache cropped to the item's own tokens, or None if b > 1) per item.
+    """
+    sizes = [steps['champ_ids'].size(0) for _, steps, _ in items]
+    new_lens = [steps['champ_ids'].size(1) for _, steps, _ in items]
+    max_new = max(new_lens)
+    prefill = items[0][2] is None
+    
+    ctx_inputs = {k: torch.cat([ctx[k] for ctx, _, _ in items]) for k in items[0][0]} if prefill else None
+    seq_inputs = None
+    if max_new > 0:
+        seq_inputs = {
+            k: torch.cat([torch.nn.functional.pad(steps[k], (0, max_new - steps[k].size(1))) for _, steps, _ in items])
+            for k in items[0][1]
+        }
+    cache = None
+    if not prefill:
+        caches = [c.expand(b) for (_, _, c), b in zip(items, sizes)]
+        cache = DraftKVCache(
+            [torch.cat([c.keys[i] for c in caches]) for i in range(len(caches[0].keys))],
+            [torch.cat([c.values[i] for c in caches]) for i in range(len(caches[0].values))]
+        )
+    
+    # Equal lengths (the usual case) only need the last position through the output head
+    last_only = len(set(new_lens)) == 1
+    logits, new_cache = model.forward_incremental(ctx_inputs, seq_inputs, cache, last_only=last_only)
+    
+    past_len = cache.length if cache is not None else 0
+    offset = 1 if prefill else 0  # Context Token
+    results = []
+    row = 0
+    for b, n in zip(sizes, new_lens):
+        rows = slice(row, row + b)
+        target_logits = logits[rows, -1 if last_only else n + offset - 1]
+        item_cache = None
+        if b == 1:
+            length = past_len + n + offset
+            item_cache = DraftKVCache(
+                [k[rows, :, :length].clone() for k in new_cache.keys],
+                [v[rows, :, :length].clone() for v in new_cache.values]
+            )
+        results.append((target_logits, item_cache))
+        row += b
+    return results
+
+def run_incremental(ctx_inputs, new_steps, cache):
+    """One draft-session prefill / extension, batched with other requests' by the scheduler when it is on."""
+    if inference_scheduler is not None:
+        return inference_scheduler.run(('incremental', (ctx_inputs, new_steps, cache)))
+    return run_incremental_group([(ctx_inputs, new_steps, cache)])[0]
+
+def run_bucketed_inference(ctx_inputs, seq_inputs, history_lens):
+    """
+    Full (non-cached) forward for a batch of histories of possibly different lengths.
+    Rows are grouped into length buckets and each bucket runs cropped to its longest row.
+    Returns raw target logits [B, Vocab].
+    """
+    buckets = {}
+    for b, n in enumerate(history_lens):
+        buckets.setdefault(bucket_for_length(n), []).append(b)
+    
+    static_shapes = getattr(inference_model, 'static_shapes', False)
+    target_logits = [None] * len(history_lens)
+    for bucket, rows in buckets.items():
+        # Static-shape builds always run at the bucket length (PAD-extended; causal, so harmless)
+        seq_len = bucket if static_shapes else min(max(history_lens[b] for b in rows) + 1, 21)
+        bucket_ctx = {k: v[rows] for k, v in ctx_inputs.items()}
+        bucket_seq = {
+            k: torch.nn.functional.pad(v[rows, :seq_len], (0, max(0, seq_len - v.size(1))))
+            for k, v in seq_inputs.items()
+        }
+        # Only the target position of each row goes through the output head
+        bucket_logits = torch.as_tensor(
+            inference_model.predict_at(bucket_ctx, bucket_seq, torch.tensor([history_lens[b] for b in rows]))
+        )
+        for i, b in enumerate(rows):
+            target_logits[b] = bucket_logits[i]
+    return torch.stack(target_logits)
+
+def run_scheduled_batch(requests):
+    """
+    InferenceScheduler batch_fn for requests queued by different threads:
+    - ('full', (ctx_inputs, seq_inputs, history_lens)): uncached full forwards, merged into one padded
+      batch; each gets its target logits back.
+    - ('incremental', (ctx_inputs, new_steps, cache)): draft-session prefills / extensions, one batched
+      forward per cache length; each gets (target logits, cache) back (see run_incremental_group).
+    """
+    results = [None] * len(requests)
+    full = [i for i, (kind, _) in enumerate(requests) if kind == 'full']
+    incremental = {}
+    for i, (kind, payload) in enumerate(requests):
+        if kind == 'incremental':
+            cache = payload[2]
+            # Prefills have no cache; extension caches always hold at least the Context Token
+            incremental.setdefault(cache.length if cache is not None else 0, []).append(i)
     
     with torch.no_grad():
-        logits = model(ctx_inputs, seq_inputs)
-        target_idx = len(history_list)
-        target_logit = logits[0, target_idx, :].clone()
+        if full:
+            items = [requests[i][1] for i in full]
+            max_len = max(seq['champ_ids'].size(1) for _, seq, _ in items)
+            ctx_inputs = {k: torch.cat([ctx[k] for ctx, _, _ in items]) for k in items[0][0]}
+            seq_inputs = {
+                k: torch.cat([torch.nn.functional.pad(seq[k], (0, max_len - seq[k].size(1))) for _, seq, _ in items])
+                for k in items[0][1]
+            }
+            history_lens = [n for _, _, lens in items for n in lens]
+            target_logits = run_bucketed_inference(ctx_inputs, seq_inputs, history_lens)
+            for i, logits in zip(full, torch.split(target_logits, [len(lens) for _, _, lens in items])):
+                results[i] = logits
+        
+        for rows in incremental.values():
+            for i, result in zip(rows, run_incremental_group([requests[i][1] for i in rows])):
+                results[i] = result
+    return results
+
+def logits_cache_keys(ctx_inputs, seq_inputs, history_lists):
+    """Logits cache key (context ids, per-step tokens) of every encoded history."""
+    ctx_key = tuple(ctx_inputs[k][0].item() for k in ('context_blue', 'context_red', 'context_game'))
+    return [(ctx_key, encoded_step_keys(seq_inputs, b, len(h))) for b, h in enumerate(history_lists)]
+
+def run_model_inference_batch(context_dict, history_lists, seen_id_sets, strategy_boost_maps=None, transformer_weight=1.0, session_key=None, use_cache=True):
+    """
+    Batched version of run_model_inference: scores several histories in a single forward.
+    seen_id_sets: One set of taken champion ids per history.
+    strategy_boost_maps: One {champ_id: boost_value} dict per history (or None).
+    session_key: If set (and all histories have the same length), re-use that draft session's KV cache.
+    use_cache: Look up / store raw logits in the logits cache (off for one-off sampled prefixes).
+    Returns (raw_logits, boosted_logits), each [B, Vocab].
+    """
+    ctx_inputs, seq_inputs = build_model_inputs(context_dict, history_lists)
+    if strategy_boost_maps is None:
+        strategy_boost_maps = [None] * len(history_lists)
+    
+    with torch.no_grad():
+        # Raw logits are cached per canonical draft prefix; everything below is applied per call.
+        if use_cache:
+            cache_keys = logits_cache_keys(ctx_inputs, seq_inputs, history_lists)
+            cached_rows = [logits_cache.get(key) for key in cache_keys]
+        else:
+            cached_rows = [None] * len(history_lists)
+        miss_rows = [b for b, row in enumerate(cached_rows) if row is None]
+        
+        if miss_rows:
+            miss_ctx = {k: v[miss_rows] for k, v in ctx_inputs.items()}
+            miss_seq = {k: v[miss_rows] for k, v in seq_inputs.items()}
+            miss_lens = [len(history_lists[b]) for b in miss_rows]
+            
+            if session_key is not None and model is not None and len(set(miss_lens)) == 1:
+                miss_logits = run_session_inference(session_key, miss_ctx, miss_seq, miss_lens[0])
+            elif inference_scheduler is not None:
+                miss_logits = inference_scheduler.run(('full', (miss_ctx, miss_seq, miss_lens)))
+            else:
+                miss_logits = run_bucketed_inference(miss_ctx, miss_seq, miss_lens)
+            
+            for i, b in enumerate(miss_rows):
+                cached_rows[b] = miss_logits[i].clone()
+                if use_cache:
+                    logits_cache.put(cache_keys[b], cached_rows[b])
+        
+        target_logits = torch.stack(cached_rows)
         
         # Apply Transformer Weight (Cross-Fade)
         # Scale raw logits before adding boost
-        target_logit = target_logit * transformer_weight
+        target_logits = target_logits * transformer_weight
         
-        # Mask Taken Champs
-        for c in seen_ids:
-            target_logit[c] = float('-inf')
-            
-        raw_logit = target_logit.clone()
-        boosted_logit = target_logit.clone()
+        # Mask Taken Champs (per row) with a single index_fill_
+        vocab_size = target_logits.size(-1)
+        apply_seen_mask_(target_logits, build_seen_index(seen_id_sets, vocab_size, target_logits.device))
+                
+        raw_logits = target_logits.clone()
         
-        # Apply Strategic Boost if provided
-        if strategy_boost_map:
-            for cid, val in strategy_boost_map.items():
-                if cid not in seen_ids:
-                    boosted_logit[cid] += val
-                    
-        return raw_logit, boosted_logit
+        # Apply Strategic Boost (per row) as one fused add; masked champions stay at -inf
+        boosted_logits = target_logits + build_boost_tensor(strategy_boost_maps, vocab_size, target_logits.device)
+                        
+        return raw_logits, boosted_logits
+
+# Helper function to run model inference on a given history
+def run_model_inference(context_dict, history_list, seen_ids, strategy_boost_map=None, transformer_weight=1.0, session_key=None):
+    """
+    Runs model inference and returns logits for the target step.
+    strategy_boost_map: Dict of {champ_id: boost_value} to apply.
+    transformer_weight: Scale factor for raw logits (Cross-Fade logic).
+    session_key: Optional draft session whose KV cache is extended instead of re-encoding the draft.
+    """
+    raw_logits, boosted_logits = run_model_inference_batch(
+        context_dict, [history_list], [seen_ids], [strategy_boost_map], transformer_weight, session_key
+    )
+    return raw_logits[0], boosted_logits[0]
+
+def precompute_logits(context_dict, history_lists):
+    """
+    SpeculativePrecompute run_fn: fills the logits cache for the histories that are not cached yet.
+    Runs on the worker thread directly (not through the scheduler) so it never delays a request batch.
+    """
+    ctx_inputs, seq_inputs = build_model_inputs(context_dict, history_lists)
+    cache_keys = logits_cache_keys(ctx_inputs, seq_inputs, history_lists)
+    miss_rows = [b for b, key in enumerate(cache_keys) if key not in logits_cache]
+    if not miss_rows:
+        return
+    
+    with torch.no_grad():
+        miss_logits = run_bucketed_inference(
+            {k: v[miss_rows] for k, v in ctx_inputs.items()},
+            {k: v[miss_rows] for k, v in seq_inputs.items()},
+            [len(history_lists[b]) for b in miss_rows]
+        )
+    for i, b in enumerate(miss_rows):
+        logits_cache.put(cache_keys[b], miss_logits[i].clone())
+
+if INFERENCE_BATCH_WINDOW_MS > 0:
+    inference_scheduler = InferenceScheduler(run_scheduled_batch, INFERENCE_BATCH_WINDOW_MS, INFERENCE_MAX_BATCH)
+
+if SPECULATIVE_PRECOMPUTE:
+    speculator = SpeculativePrecompute(precompute_logits, SPECULATIVE_CHUNK)
 
 # -------------------------------------------------------------------
 # Stateful Logic for AI Takeover
@@ -618,6 +1032,307 @@ ROLE_RECOMMENDATIONS = {
     'SUPPORT': ['Thresh', 'Nautilus', 'Leona', 'Lulu', 'Karma', 'Renata Glasc', 'Braum', 'Rakan', 'Alistar', 'Milio']
 }
 
+def get_champ_name(arr, idx):
+    if idx < len(arr) and arr[idx]:
+        return arr[idx].get('name')
+    return None
+
+def reconstruct_draft(data, current_idx):
+    """
+    Rebuilds the model history of a /predict-style payload up to current_idx.
+    Returns (history_list, seen_champs, fearless_bans, draft_text, current_step_info).
+    """
+    blue_team_data = data.get('blueTeam', {})
+    red_team_data = data.get('redTeam', {})
+    
+    history_list = []
+    seen_champs = set()
+
+    # Add Fearless Bans to seen_champs if provided
+    # Data Dragon ids (MonkeyKing, KSante, ...) are mapped to display names by the resolver
+    fearless_bans = data.get('fearlessBans', [])
+    fearless_bans = [tokenizer.resolver.canonical_name(fb) or fb for fb in fearless_bans]
+
+    for fb_name in fearless_bans:
+        cid = tokenizer.resolver.resolve(fb_name)
+        if cid is not None:
+            seen_champs.add(cid)
+        else:
+            print(f"DEBUG: Could not find CID for fearless ban: {fb_name}")
+
+    b_bans = data.get('blueBans', [])
+    r_bans = data.get('redBans', [])
+    b_picks = data.get('bluePicks', [])
+    r_picks = data.get('redPicks', [])
+
+    steps_processed = 0
+    current_step_info = None
+
+    # Helper to build text description of draft for reasoning
+    draft_text = f"Blue Team: {blue_team_data.get('name')}\nRed Team: {red_team_data.get('name')}\n"
+
+    for i in range(len(DRAFT_ORDER)):
+        side, action = DRAFT_ORDER[i]
+
+        if i == current_idx:
+            current_step_info = (side, action)
+
+        if i >= current_idx:
+            continue
+
+        occurrence = 0
+        for j in range(i):
+            s, a = DRAFT_ORDER[j]
+            if s == side and a == action:
+                occurrence += 1
+
+        c_name = None
+        if side == 'blue':
+            if action == 'BAN': c_name = get_champ_name(b_bans, occurrence)
+            else: c_name = get_champ_name(b_picks, occurrence)
+        else:
+            if action == 'BAN': c_name = get_champ_name(r_bans, occurrence)
+            else: c_name = get_champ_name(r_picks, occurrence)
+
+        if c_name:
+            draft_text += f"{i+1}. {side.upper()} {action}: {c_name}\n"
+
+            c_classes = champ_class_map.get(c_name.upper(), [])
+            history_list.append({
+                "step": steps_processed + 1,
+                "champion": c_name,
+                "action": action,
+                "acting_team": side.upper(),
+                "champion_classes": c_classes
+            })
+
+            cid = tokenizer.resolver.resolve(c_name)
+            if cid: 
+                seen_champs.add(cid)
+
+            steps_processed += 1
+
+    if current_step_info:
+        draft_text += f"CURRENT STEP: {current_step_info[0].upper()} {current_step_info[1]}\n"
+    
+    return history_list, seen_champs, fearless_bans, draft_text, current_step_info
+
+# -------------------------------------------------------------------
+# Draft Search (Beam Completion / Monte Carlo Rollouts)
+# -------------------------------------------------------------------
+
+MAX_COMPLETION_BEAMS = 32
+MAX_ROLLOUTS_PER_CANDIDATE = 256
+
+def make_history_entry(step, name, side, action):
+    return {
+        "step": step,
+        "champion": name,
+        "action": action,
+        "acting_team": side.upper(),
+        "champion_classes": champ_class_map.get(name.upper(), [])
+    }
+
+def non_champion_ids():
+    """Vocab ids that are not champions ([PAD], STEP_n, team / class tokens); never a valid draft slot."""
+    return set(tokenizer.vocab.values()) - set(tokenizer.resolver.names)
+
+def draft_context(data):
+    return {
+        "blue_team": data.get('blueTeam', {}).get('name', 'BLUE'),
+        "red_team": data.get('redTeam', {}).get('name', 'RED'),
+        "game_in_series": 1
+    }
+
+def continuation_score_fn(context_dict, history_list, use_cache=True):
+    """
+    draft_search score function: appends each continuation's (step_idx, champ_id) steps to
+    history_list and scores all of them with one run_model_inference_batch call (raw logits).
+    """
+    def score_fn(continuations, seen_id_sets):
+        histories = []
+        for continuation in continuations:
+            history = history_list.copy()
+            for step_idx, cid in continuation:
+                side, action = DRAFT_ORDER[step_idx]
+                history.append(make_history_entry(len(history) + 1, tokenizer.id_to_token[cid], side, action))
+            histories.append(history)
+        raw_logits, _ = run_model_inference_batch(context_dict, histories, seen_id_sets, use_cache=use_cache)
+        return raw_logits
+    return score_fn
+
+def complete_draft(data, beam_width=8, top_n=5):
+    """
+    Beam search over the rest of DRAFT_ORDER from a /predict-style partial draft.
+    Every search step scores all live beams in one batched forward (per-beam seen masks).
+    Returns the top_n most likely full drafts as JSON-ready dicts.
+    """
+    current_idx = data.get('currentStepIndex', 0)
+    history_list, seen_champs, _, _, _ = reconstruct_draft(data, current_idx)
+    
+    # Beam prefixes are one-off states: caching them would evict the real drafts /predict looks up
+    beams = beam_search_draft(
+        continuation_score_fn(draft_context(data), history_list, use_cache=False), DRAFT_ORDER, current_idx,
+        seen_champs | non_champion_ids(), beam_width=beam_width, top_n=top_n
+    )
+    
+    drafts = []
+    for beam in beams:
+        drafts.append({
+            "probability": beam['probability'],
+            "logProb": beam['log_prob'],
+            "steps": [
+                {
+                    "step": step_idx + 1,
+                    "side": DRAFT_ORDER[step_idx][0],
+                    "action": DRAFT_ORDER[step_idx][1],
+                    "championName": tokenizer.id_to_token.get(cid, "UNK")
+                }
+                for step_idx, cid in beam['steps']
+            ]
+        })
+    return drafts
+
+def evaluate_rollouts(context_dict, history_list, seen_champs, current_idx, candidate_ids,
+                      rollouts=ROLLOUTS_PER_CANDIDATE, budget_ms=200.0):
+    """
+    Monte Carlo rollouts of the rest of the draft for each candidate at current_idx
+    (candidates x rollouts sampled as one batch per draft step, see draft_search.rollout_candidates).
+    Returns one {'rollouts', 'survival', 'opponentResponses'} dict per candidate.
+    """
+    if current_idx >= len(DRAFT_ORDER) or not candidate_ids:
+        return [None] * len(candidate_ids)
+    
+    # Sampled prefixes almost never repeat, so they would only evict real drafts from the logits cache
+    results = rollout_candidates(
+        continuation_score_fn(context_dict, history_list, use_cache=False), DRAFT_ORDER, current_idx,
+        seen_champs | non_champion_ids(), candidate_ids,
+        rollouts_per_round=max(1, min(rollouts, 16)), max_rollouts=rollouts, time_budget_ms=budget_ms
+    )
+    return [
+        {
+            "rollouts": r['rollouts'],
+            "survival": None if r['survival'] is None else round(r['survival'] * 100, 1),
+            "opponentResponses": [
+                {"championName": tokenizer.id_to_token.get(cid, "UNK"), "frequency": round(f * 100, 1)}
+                for cid, f in r['opponent_responses']
+            ]
+        }
+        for r in results
+    ]
+
+def search_lookahead(context_dict, history_list, seen_champs, current_idx, candidate_ids, depth):
+    """
+    Depth-N expectimax / minimax from current_idx over candidate_ids (see draft_search.lookahead_search).
+    Returns ({champ_id: {'value', 'line'}}, search stats).
+    """
+    # Search states are deduplicated by the transposition table; caching them would evict real drafts
+    results, search_stats = lookahead_search(
+        continuation_score_fn(context_dict, history_list, use_cache=False), DRAFT_ORDER, current_idx,
+        seen_champs | non_champion_ids(), depth=depth, top_k=LOOKAHEAD_TOP_K, root_candidates=candidate_ids,
+        mode=LOOKAHEAD_MODE, node_budget=LOOKAHEAD_NODE_BUDGET, time_budget_ms=LOOKAHEAD_LATENCY_MS
+    )
+    by_champ = {}
+    for r in results:
+        by_champ[r['champ_id']] = {
+            "value": round(r['value'], 3),
+            "line": [
+                {
+                    "step": step_idx + 1,
+                    "side": DRAFT_ORDER[step_idx][0],
+                    "action": DRAFT_ORDER[step_idx][1],
+                    "championName": tokenizer.id_to_token.get(cid, "UNK")
+                }
+                for step_idx, cid in r['line']
+            ]
+        }
+    return by_champ, search_stats
+
+# -------------------------------------------------------------------
+# Full-Draft Replay Scoring
+# -------------------------------------------------------------------
+
+MAX_SCORED_DRAFTS = 64
+
+def run_full_draft_inference(ctx_inputs, seq_inputs, seq_len):
+    """
+    Next-step logits for every position of every row, [B, seq_len, Vocab], from ONE forward.
+    Position t only attends to the context + steps before t (causal), so it scores step t.
+    """
+    if model is not None:
+        return model.output_head(model.forward_hidden(ctx_inputs, seq_inputs)[:, :seq_len])
+    
+    # onnx / ensemble predictors only expose predict_at: every position becomes its own row
+    batch_size = seq_inputs['champ_ids'].size(0)
+    rep_ctx = {k: v.repeat_interleave(seq_len, dim=0) for k, v in ctx_inputs.items()}
+    rep_seq = {k: v.repeat_interleave(seq_len, dim=0) for k, v in seq_inputs.items()}
+    target_idx = torch.arange(seq_len).repeat(batch_size)
+    logits = torch.as_tensor(inference_model.predict_at(rep_ctx, rep_seq, target_idx))
+    return logits.view(batch_size, seq_len, -1)
+
+def score_drafts(context_dicts, history_lists, seen_id_sets, top_k=5):
+    """
+    Replays complete (or partial) drafts: for every step, the model's top_k, and the probability and rank of
+    the champion that was actually taken. All drafts are scored in one forward; champions taken earlier
+    in each draft are masked with cumulative_seen_mask, seen_id_sets (fearless bans) and non-champion
+    tokens for every step.
+    Returns one list of per-step dicts per draft.
+    """
+    seq_len = max(len(h) for h in history_lists)
+    encoded = [tokenizer.encode(c, h, max_len=seq_len) for c, h in zip(context_dicts, history_lists)]
+    ctx_inputs = {
+        'context_blue': torch.tensor([e['context']['blue_team_id'] for e in encoded]).to(DEVICE),
+        'context_red': torch.tensor([e['context']['red_team_id'] for e in encoded]).to(DEVICE),
+        'context_game': torch.tensor([e['context']['game_num'] for e in encoded]).to(DEVICE)
+    }
+    seq_inputs = {
+        'champ_ids': torch.tensor([e['sequence']['champion_ids'] for e in encoded]).to(DEVICE),
+        'action_ids': torch.tensor([e['sequence']['action_ids'] for e in encoded]).to(DEVICE),
+        'team_ids': torch.tensor([e['sequence']['team_ids'] for e in encoded]).to(DEVICE),
+        'pos_ids': torch.tensor([e['sequence']['position_ids'] for e in encoded]).to(DEVICE)
+    }
+    
+    with torch.no_grad():
+        logits = run_full_draft_inference(ctx_inputs, seq_inputs, seq_len).float()
+        vocab_size = logits.size(-1)
+        champ_ids = seq_inputs['champ_ids']
+        
+        # [B, T, Vocab] taken-before-step mask + per-draft [B, Vocab] unavailable ids
+        unavailable = cumulative_seen_mask(champ_ids, vocab_size, tokenizer.pad_token_id)
+        static = torch.zeros((len(history_lists), vocab_size), dtype=torch.bool, device=logits.device)
+        blocked = non_champion_ids()
+        for row, seen_ids in enumerate(seen_id_sets):
+            static[row, list(blocked | set(seen_ids))] = True
+        log_probs = torch.log_softmax(logits.masked_fill(unavailable | static.unsqueeze(1), float('-inf')), dim=-1)
+        
+        actual_lp = log_probs.gather(-1, champ_ids.unsqueeze(-1)).squeeze(-1)  # [B, T]
+        ranks = (log_probs > actual_lp.unsqueeze(-1)).sum(dim=-1) + 1
+        top_lp, top_ids = torch.topk(log_probs, top_k, dim=-1)
+    
+    actual_p = actual_lp.exp().tolist()
+    ranks = ranks.tolist()
+    top_p = top_lp.exp().tolist()
+    top_ids = top_ids.tolist()
+    scored = []
+    for b, history in enumerate(history_lists):
+        steps = []
+        for t, entry in enumerate(history):
+            legal = actual_lp[b, t].item() > float('-inf')
+            steps.append({
+                "step": t + 1,
+                "side": entry['acting_team'].lower(),
+                "action": entry['action'],
+                "championName": entry['champion'],
+                "probability": round(actual_p[b][t] * 100, 2),
+                "rank": ranks[b][t] if legal else None,
+                "topK": [
+                    {"championName": tokenizer.id_to_token.get(cid, "UNK"), "probability": round(p * 100, 2)}
+                    for cid, p in zip(top_ids[b][t], top_p[b][t])
+                ]
+            })
+        scored.append(steps)
+    return scored
+
 def get_predictions_logic(data):
     try:
         # data arg passed directly
@@ -627,103 +1342,21 @@ def get_predictions_logic(data):
         red_team_data = data.get('redTeam', {})
         
         # 1. Reconstruct History
-        history_list = []
-        seen_champs = set()
-        
-        # Add Fearless Bans to seen_champs if provided
-        fearless_bans = data.get('fearlessBans', [])
-        mapping = {
-            'MonkeyKing': 'Wukong',
-            'KSante': "K'Sante",
-            'XinZhao': 'Xin Zhao',
-            'DrMundo': 'Dr Mundo',
-            'AurelionSol': 'Aurelion Sol',
-            'Kaisa': "Kai'Sa",
-            'MissFortune': 'Miss Fortune',
-            'Renata': 'Renata Glasc',
-            'JarvanIV': 'Jarvan IV',
-            'LeeSin': 'Lee Sin',
-            'Reksai': "Rek'Sai"
-        }
-        fearless_bans = [mapping.get(fb, fb) for fb in fearless_bans]
-
-        for fb_name in fearless_bans:
-            cid = tokenizer.vocab.get(fb_name)
-            if cid is None:
-                for k, v in tokenizer.vocab.items():
-                    if k.upper() == fb_name.upper():
-                        cid = v
-                        break
-            if cid is not None:
-                seen_champs.add(cid)
-            else:
-                print(f"DEBUG: Could not find CID for fearless ban: {fb_name}")
+        history_list, seen_champs, fearless_bans, draft_text, current_step_info = reconstruct_draft(data, current_idx)
+        session_key = get_session_key(data)
+        # Speculation only replaces / prunes queued work (the results are shared through the
+        # prefix-keyed logits cache), so drafts without a sessionId can fall back to the matchup.
+        speculation_key = session_key or (blue_team_data.get('name'), red_team_data.get('name'))
         
+        # Speculation queued for other continuations of this draft is now stale
+        if speculator is not None:
+            speculator.cancel_diverged(speculation_key, history_key(history_list))
+
         b_bans = data.get('blueBans', [])
         r_bans = data.get('redBans', [])
         b_picks = data.get('bluePicks', [])
         r_picks = data.get('redPicks', [])
 
-        def get_champ_name(arr, idx):
-            if idx < len(arr) and arr[idx]:
-                return arr[idx].get('name')
-            return None
-
-        steps_processed = 0
-        current_step_info = None
-        
-        # Helper to build text description of draft for reasoning
-        draft_text = f"Blue Team: {blue_team_data.get('name')}\nRed Team: {red_team_data.get('name')}\n"
-        
-        for i in range(len(DRAFT_ORDER)):
-            side, action = DRAFT_ORDER[i]
-            
-            if i == current_idx:
-                current_step_info = (side, action)
-            
-            if i >= current_idx:
-                continue
-
-            occurrence = 0
-            for j in range(i):
-                s, a = DRAFT_ORDER[j]
-                if s == side and a == action:
-                    occurrence += 1
-            
-            c_name = None
-            if side == 'blue':
-                if action == 'BAN': c_name = get_champ_name(b_bans, occurrence)
-                else: c_name = get_champ_name(b_picks, occurrence)
-            else:
-                if action == 'BAN': c_name = get_champ_name(r_bans, occurrence)
-                else: c_name = get_champ_name(r_picks, occurrence)
-            
-            if c_name:
-                draft_text += f"{i+1}. {side.upper()} {action}: {c_name}\n"
-                
-                c_classes = champ_class_map.get(c_name.upper(), [])
-                history_list.append({
-                    "step": steps_processed + 1,
-                    "champion": c_name,
-                    "action": action,
-                    "acting_team": side.upper(),
-                    "champion_classes": c_classes
-                })
-                
-                cid = tokenizer.vocab.get(c_name)
-                if not cid:
-                    for k,v in tokenizer.vocab.items():
-                        if k.upper() == c_name.upper():
-                            cid = v
-                            break
-                if cid: 
-                    seen_champs.add(cid)
-                
-                steps_processed += 1
-        
-        if current_step_info:
-            draft_text += f"CURRENT STEP: {current_step_info[0].upper()} {current_step_info[1]}\n"
-
         # 2. Prepare Context for Inference
         context_dict = {
             "blue_team": blue_team_data.get('name', 'BLUE'),
@@ -746,25 +1379,13 @@ def get_predictions_logic(data):
         if candidate_result:
             filtered_blue = []
             for c in candidate_result.get('blue', []):
-                name = c.get('name')
-                cid = tokenizer.vocab.get(name)
-                if cid is None:
-                    for k, v in tokenizer.vocab.items():
-                        if k.upper() == name.upper():
-                            cid = v
-                            break
+                cid = tokenizer.resolver.resolve(c.get('name'))
                 if cid is not None and cid not in seen_champs:
                     filtered_blue.append(c)
             
             filtered_red = []
             for c in candidate_result.get('red', []):
-                name = c.get('name')
-                cid = tokenizer.vocab.get(name)
-                if cid is None:
-                    for k, v in tokenizer.vocab.items():
-                        if k.upper() == name.upper():
-                            cid = v
-                            break
+                cid = tokenizer.resolver.resolve(c.get('name'))
                 if cid is not None and cid not in seen_champs:
                     filtered_red.append(c)
             
@@ -811,19 +1432,14 @@ def get_predictions_logic(data):
             
             if not c_name: continue
 
-            cid = tokenizer.vocab.get(c_name)
-            if not cid:
-                for k,v in tokenizer.vocab.items():
-                    if k.upper() == c_name.upper():
-                        cid = v
-                        break
+            cid = tokenizer.resolver.resolve(c_name)
             if cid:
                 # Final Boost = Confidence * Decay
                 final_boost = conf * decay_factor
                 strategy_boost_map[cid] = final_boost
 
         # ========== PRIMARY INFERENCE ==========
-        raw_logit, target_logit = run_model_inference(context_dict, history_list, seen_champs, strategy_boost_map, transformer_weight)
+        raw_logit, target_logit = run_model_inference(context_dict, history_list, seen_champs, strategy_boost_map, transformer_weight, session_key)
         
         # Log Top 20 for Debugging
         print(f"\n--- Top 20 Champion Probabilities (Step {current_idx + 1}) ---")
@@ -877,24 +1493,28 @@ def get_predictions_logic(data):
                 if c_name:
                     gemini_confidence_map[c_name] = conf
             
-        for rec in temp_recommendations:
-            name = rec['championName']
-            rec_id = rec['championId']
-            
-            # Reasoning Text - now supports bullet point lists
-            reasoning_data_raw = champion_analyses.get(name, ["• Strong pick based on draft trends."])
-            # Handle both list (new bullet format) and string (legacy format)
-            if isinstance(reasoning_data_raw, list):
-                rec_reasons = reasoning_data_raw
-            else:
-                rec_reasons = [reasoning_data_raw]
-            
-            # === TRANSFORMER LOOKAHEAD SIMULATION ===
-            # Simulate picking this champion and see what opponent would do
-            formatted_opponent_responses = []
+        # === TRANSFORMER LOOKAHEAD SIMULATION (Batched) ===
+        # Simulate picking each recommendation and see what opponent would do.
+        # All simulated histories are scored in a single forward pass.
+        opponent_responses_by_rec = [[] for _ in temp_recommendations]
+        speculative_histories = []  # each simulated branch + each opponent response: the likely next states
+        
+        if next_step_info and temp_recommendations:  # Only simulate if there's a next step
+            # Prepare Boost Map for Opponent (Lookahead) - shared by every simulated branch
+            opp_boost_map = {}
+            for item in opp_candidates:
+                c_name = item.get('name') if isinstance(item, dict) else item
+                conf = float(item.get('confidence', 5.0)) if isinstance(item, dict) else 5.0
+                if not c_name: continue
+                
+                cid = tokenizer.resolver.resolve(c_name)
+                if cid:
+                    opp_boost_map[cid] = conf * decay_factor
             
-            if next_step_info:  # Only simulate if there's a next step
-                opponent_side, opponent_action = next_step_info
+            simulated_histories = []
+            simulated_seen_sets = []
+            for rec in temp_recommendations:
+                name = rec['championName']
                 
                 # Create a simulated history with this pick added
                 simulated_history = history_list.copy()
@@ -906,54 +1526,80 @@ def get_predictions_logic(data):
                     "acting_team": current_step_info[0].upper(),
                     "champion_classes": c_classes
                 })
+                simulated_histories.append(simulated_history)
                 
                 # Update seen champions to include this pick
                 simulated_seen = seen_champs.copy()
-                simulated_seen.add(rec_id)
+                simulated_seen.add(rec['championId'])
+                simulated_seen_sets.append(simulated_seen)
+            
+            # Run model inference for opponent's next move (one batched forward)
+            try:
+                # Lookahead is 1 step ahead, so use the next step's transformer weight.
+                next_idx = current_idx + 1
+                lookahead_weight = min(1.0, 0.40 + (next_idx / 20.0))
                 
-                # Prepare Boost Map for Opponent (Lookahead)
-                opp_boost_map = {}
-                for item in opp_candidates:
-                    c_name = item.get('name') if isinstance(item, dict) else item
-                    conf = float(item.get('confidence', 5.0)) if isinstance(item, dict) else 5.0
-                    if not c_name: continue
-                    
-                    cid = tokenizer.vocab.get(c_name)
-                    if not cid:
-                        for k,v in tokenizer.vocab.items():
-                            if k.upper() == c_name.upper():
-                                cid = v
-                                break
-                    if cid:
-                        opp_boost_map[cid] = conf * decay_factor
-
-                # Run model inference for opponent's next move
-                try:
-                    # Lookahead Simulation: Use slightly higher weight as it's a future step?
-                    # Or same weight. Let's use same transformer_weight concept.
-                    # Actually, lookahead is 1 step ahead.
-                    next_idx = current_idx + 1
-                    lookahead_weight = min(1.0, 0.40 + (next_idx / 20.0))
-                    
-                    _, opponent_logit = run_model_inference(
-                        context_dict,
-                        simulated_history,
-                        simulated_seen,
-                        opp_boost_map,  # Use Intelligence Boost for lookahead
-                        lookahead_weight
-                    )
-                    
-                    # Get top 5 predictions for opponent
-                    opp_probs, opp_indices = torch.topk(torch.softmax(opponent_logit, dim=-1), 5)
-                    
-                    for opp_idx in opp_indices:
-                        opp_name = tokenizer.id_to_token.get(opp_idx.item(), "UNK")
+                _, opponent_logits = run_model_inference_batch(
+                    context_dict,
+                    simulated_histories,
+                    simulated_seen_sets,
+                    [opp_boost_map] * len(simulated_histories),  # Use Intelligence Boost for lookahead
+                    lookahead_weight,
+                    session_key  # Branches extend the current draft's KV cache by one step
+                )
+                
+                # Get top 5 predictions for opponent, per simulated branch
+                _, opp_indices = torch.topk(torch.softmax(opponent_logits, dim=-1), 5, dim=-1)
+                
+                for b, row in enumerate(opp_indices.tolist()):
+                    for opp_idx in row:
+                        opp_name = tokenizer.id_to_token.get(opp_idx, "UNK")
                         if opp_name != "UNK":
-                            formatted_opponent_responses.append({
+                            opponent_responses_by_rec[b].append({
                                 "championName": opp_name
                             })
-                except Exception as e:
-                    print(f"⚠️ Lookahead failed for {name}: {e}")
+                            speculative_histories.append(simulated_histories[b] + [make_history_entry(
+                                len(simulated_histories[b]) + 1, opp_name, next_step_info[0], next_step_info[1]
+                            )])
+            except Exception as e:
+                print(f"⚠️ Lookahead failed: {e}")
+            
+        # === MONTE CARLO ROLLOUTS (optional, time-budgeted) ===
+        # Full-draft continuations per recommendation: does each pick survive to our next turn,
+        # and what does the opponent answer with?
+        rollouts_by_rec = [None] * len(temp_recommendations)
+        if ROLLOUT_BUDGET_MS > 0 and next_step_info and temp_recommendations:
+            try:
+                rollouts_by_rec = evaluate_rollouts(
+                    context_dict, history_list, seen_champs, current_idx,
+                    [rec['championId'] for rec in temp_recommendations], budget_ms=ROLLOUT_BUDGET_MS
+                )
+            except Exception as e:
+                print(f"⚠️ Rollouts failed: {e}")
+            
+        # === DEPTH-N ADVERSARIAL LOOKAHEAD (optional, node / latency capped) ===
+        lookahead_by_champ = {}
+        if LOOKAHEAD_DEPTH > 0 and next_step_info and temp_recommendations:
+            try:
+                lookahead_by_champ, search_stats = search_lookahead(
+                    context_dict, history_list, seen_champs, current_idx,
+                    [rec['championId'] for rec in temp_recommendations], LOOKAHEAD_DEPTH
+                )
+                print(f"🌳 Lookahead: depth {search_stats['depth']} | {search_stats['nodes']} nodes | "
+                      f"{search_stats['transpositions']} transpositions | {search_stats['elapsed_ms']:.0f}ms")
+            except Exception as e:
+                print(f"⚠️ Lookahead search failed: {e}")
+            
+        for rec, formatted_opponent_responses, rollout in zip(temp_recommendations, opponent_responses_by_rec, rollouts_by_rec):
+            name = rec['championName']
+            
+            # Reasoning Text - now supports bullet point lists
+            reasoning_data_raw = champion_analyses.get(name, ["• Strong pick based on draft trends."])
+            # Handle both list (new bullet format) and string (legacy format)
+            if isinstance(reasoning_data_raw, list):
+                rec_reasons = reasoning_data_raw
+            else:
+                rec_reasons = [reasoning_data_raw]
             
             # Get Gemini confidence if available  
             gemini_conf = gemini_confidence_map.get(name, 0)
@@ -964,9 +1610,15 @@ def get_predictions_logic(data):
                 "winRate": rec['winRate'],  # Transformer probability (0-100%)
                 "geminiConfidence": gemini_conf,  # Gemini strategic confidence (0-10)
                 "reasoning": rec_reasons,
-                "opponentResponses": formatted_opponent_responses
+                "opponentResponses": formatted_opponent_responses,
+                "rollout": rollout,
+                "lookahead": lookahead_by_champ.get(rec['championId'])
             })
             
+        # Warm the cache for the next request while the humans pick
+        if speculator is not None:
+            speculator.submit(speculation_key, context_dict, speculative_histories)
+            
         return { 
             "recommendations": recommendations,
             "analysis": {
@@ -980,17 +1632,101 @@ def get_predictions_logic(data):
         print(f"Error in predictions logic: {e}")
         return { "error": str(e) }
 
+def foreground_request():
+    """Holds off speculative precompute while a request is being served."""
+    return speculator.foreground() if speculator is not None else nullcontext()
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
         data = request.json
-        result = get_predictions_logic(data)
+        with foreground_request():
+            result = get_predictions_logic(data)
         if "error" in result:
              return jsonify(result), 500
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/complete-draft', methods=['POST'])
+def complete_draft_route():
+    try:
+        data = request.json or {}
+        beam_width = max(1, min(int(data.get('beamWidth', 8)), MAX_COMPLETION_BEAMS))
+        top_n = max(1, min(int(data.get('topN', 5)), beam_width))
+        return jsonify({"drafts": complete_draft(data, beam_width, top_n)})
+    except Exception as e:
+        print(f"❌ Complete Draft Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/draft/rollouts', methods=['POST'])
+def draft_rollouts():
+    try:
+        data = request.json or {}
+        current_idx = data.get('currentStepIndex', 0)
+        history_list, seen_champs, _, _, _ = reconstruct_draft(data, current_idx)
+        context_dict = draft_context(data)
+        
+        # Candidates default to the model's top picks for the current step
+        names = data.get('candidates')
+        if names:
+            candidate_ids = [cid for cid in (tokenizer.resolver.resolve(n) for n in names) if cid is not None]
+        elif current_idx < len(DRAFT_ORDER):
+            raw_logit, _ = run_model_inference(context_dict, history_list, seen_champs | non_champion_ids())
+            candidate_ids = torch.topk(raw_logit, int(data.get('numCandidates', 5))).indices.tolist()
+        else:
+            candidate_ids = []
+        
+        rollouts = max(1, min(int(data.get('rollouts', ROLLOUTS_PER_CANDIDATE)), MAX_ROLLOUTS_PER_CANDIDATE))
+        results = evaluate_rollouts(
+            context_dict, history_list, seen_champs, current_idx, candidate_ids,
+            rollouts=rollouts, budget_ms=float(data.get('budgetMs', 200.0))
+        )
+        return jsonify({"candidates": [
+            {"championName": tokenizer.id_to_token.get(cid, "UNK"), **(result or {})}
+            for cid, result in zip(candidate_ids, results)
+        ]})
+    except Exception as e:
+        print(f"❌ Rollout Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/draft/score', methods=['POST'])
+def draft_score():
+    try:
+        data = request.json or {}
+        drafts = data.get('drafts') or [data]
+        if len(drafts) > MAX_SCORED_DRAFTS:
+            return jsonify({"error": f"At most {MAX_SCORED_DRAFTS} drafts per request"}), 400
+        
+        # Completed drafts by default; each draft uses the /predict payload layout
+        parsed = [reconstruct_draft(d, d.get('currentStepIndex', len(DRAFT_ORDER))) for d in drafts]
+        if any(not history for history, *_ in parsed):
+            return jsonify({"error": "Every draft needs at least one step"}), 400
+        
+        scored = score_drafts(
+            [draft_context(d) for d in drafts],
+            [history for history, *_ in parsed],
+            [
+                {cid for cid in map(tokenizer.resolver.resolve, fearless_bans) if cid is not None}
+                for _, _, fearless_bans, _, _ in parsed
+            ],
+            top_k=max(1, min(int(data.get('topK', 5)), 20))
+        )
+        
+        results = []
+        for steps in scored:
+            ranked = [s['rank'] for s in steps if s['rank'] is not None]
+            results.append({
+                "steps": steps,
+                "top1": sum(r == 1 for r in ranked),
+                "top5": sum(r <= 5 for r in ranked),
+                "meanRank": round(sum(ranked) / len(ranked), 2) if ranked else None
+            })
+        return jsonify({"drafts": results})
+    except Exception as e:
+        print(f"❌ Draft Score Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/draft/load', methods=['POST'])
 def load_draft():
     global draft_state
@@ -1010,7 +1746,9 @@ def load_draft():
             "blueBans": parse_list(data.get('blue_team', {}).get('bans', [])),
             "redBans": parse_list(data.get('red_team', {}).get('bans', [])),
             "bluePicks": parse_list(data.get('blue_team', {}).get('picks', [])),
-            "redPicks": parse_list(data.get('red_team', {}).get('picks', []))
+            "redPicks": parse_list(data.get('red_team', {}).get('picks', [])),
+            # There is one loaded draft at a time, so it gets one KV session of its own
+            "sessionId": data.get('sessionId') or "loaded-draft"
         }
         
         # Clear cache to force fresh analysis for the new draft state
@@ -1030,7 +1768,8 @@ def get_recommendations():
              return jsonify({"recommendations": [], "by_role": ROLE_RECOMMENDATIONS})
 
         # Run prediction on stored state
-        result = get_predictions_logic(draft_state)
+        with foreground_request():
+            result = get_predictions_logic(draft_state)
         
         if "error" in result:
             return jsonify(result), 500
@@ -1045,6 +1784,15 @@ def get_recommendations():
 
 
 
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify({
+        "logits_cache": logits_cache.stats(),
+        "draft_sessions": len(draft_sessions),
+        "scheduler": inference_scheduler.stats() if inference_scheduler is not None else None,
+        "speculative": speculator.stats() if speculator is not None else None
+    })
+
 @app.route('/patch-report', methods=['GET'])
 def patch_report():
     try:
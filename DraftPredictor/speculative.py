@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+def history_key(history):
+    """Order-sensitive identity of a draft history (what the model is shown), used for prefix checks."""
+    return tuple((e['champion'], e['action'], e['acting_team']) for e in history)
+
+
+class SpeculativePrecompute:
+    """
+    Low-priority background precompute of likely next draft states.
+
+    After a prediction, the caller submits the histories it expects to be asked about next
+    (e.g. each recommendation followed by each simulated opponent response). A single worker
+    thread scores them in small chunks with `run_fn(context, histories)` (which fills the
+    logits cache), so the next request is usually a cache hit.
+
+    - One pending job per draft session; a new submission replaces the old one.
+    - cancel_diverged() drops pending histories that no longer extend the actual draft.
+    - Speculative chunks and foreground requests never overlap: the worker only starts a chunk while
+      no foreground request is in flight, and a request that arrives mid-chunk waits for that chunk
+      (at most chunk_size histories) before it runs. The forwards run on torch's process-wide intra-op
+      pool, whose thread count cannot be limited per thread, so this exclusion is what keeps speculation
+      off the CPU that live requests need. The lowered OS priority (nice) only covers the worker's own
+      Python thread.
+    """
+
+    def __init__(self, run_fn, chunk_size=8, nice=10, idle_poll_ms=5.0):
+        self.run_fn = run_fn
+        self.chunk_size = chunk_size
+        self.nice = nice
+        self.idle_poll = idle_poll_ms / 1000.0
+        self._jobs = OrderedDict()  # session_key -> (context, deque of histories)
+        self._cond = threading.Condition()
+        self._foreground = 0
+        self._busy = False  # a speculative chunk is running
+
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.errors = 0
+
+        self._worker = threading.Thread(target=self._run, name="speculative-precompute", daemon=True)
+        self._worker.start()
+
+    def submit(self, session_key, context, histories):
+        with self._cond:
+            old = self._jobs.pop(session_key, None)
+            if old is not None:
+                self.cancelled += len(old[1])
+            if histories:
+                self._jobs[session_key] = (context, deque(histories))
+                self.submitted += len(histories)
+            self._cond.notify_all()
+
+    def cancel_diverged(self, session_key, prefix):
+        """Keeps only the pending histories of session_key that start with `prefix` (a history_key)."""
+        with self._cond:
+            job = self._jobs.get(session_key)
+            if job is None:
+                return
+            kept = deque(h for h in job[1] if history_key(h)[:len(prefix)] == prefix)
+            self.cancelled += len(job[1]) - len(kept)
+            if kept:
+                self._jobs[session_key] = (job[0], kept)
+            else:
+                del self._jobs[session_key]
+
+    @contextmanager
+    def foreground(self):
+        """
+        Marks a foreground request; the worker does not start a chunk while any is in flight.
+        Waits for a chunk that is already running, so the two never share the intra-op pool.
+        """
+        with self._cond:
+            self._foreground += 1
+            while self._busy:
+                self._cond.wait()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._foreground -= 1
+                self._cond.notify_all()
+
+    def _next_chunk(self):
+        with self._cond:
+            while not self._jobs or self._foreground:
+                self._cond.wait(timeout=None if not self._jobs else self.idle_poll)
+            # Round-robin over sessions, oldest first
+            session_key, (context, histories) = next(iter(self._jobs.items()))
+            chunk = [histories.popleft() for _ in range(min(self.chunk_size, len(histories)))]
+            del self._jobs[session_key]
+            if histories:
+                self._jobs[session_key] = (context, histories)
+            self._busy = True
+            return context, chunk
+
+    def _run(self):
+        try:
+            # Linux applies setpriority to the calling thread only (not to torch's intra-op threads)
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except (AttributeError, OSError):
+            pass
+
+        while True:
+            context, chunk = self._next_chunk()
+            try:
+                self.run_fn(context, chunk)
+                with self._cond:
+                    self.completed += len(chunk)
+            except Exception as e:
+                print(f"⚠️ Speculative precompute failed: {e}")
+                with self._cond:
+                    self.errors += 1
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+            time.sleep(0)  # let request threads in between chunks
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": sum(len(h) for _, h in self._jobs.values()),
+                "sessions": len(self._jobs),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "errors": self.errors
+            }
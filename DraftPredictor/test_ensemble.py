@@ -0,0 +1,76 @@
+"""
+Parity test for the stacked-weight checkpoint ensemble (ensemble.py).
+
+    python test_ensemble.py [--checkpoints "model_epoch_1[8-9].pt,model_epoch_20.pt"]
+
+DraftEnsemble re-implements the DraftTransformer forward on stacked parameters, so a change to model.py
+that is not mirrored there silently changes ensemble output. This checks every member's logits against
+that checkpoint's own predict_at, and the ensemble's predict_at against the mean of the members, over a
+range of batch sizes and sequence lengths with per-row target positions.
+"""
+import argparse
+import os
+import sys
+
+import torch
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'TrainedTransformer'))
+
+from bundle import open_bundle
+from ensemble import DraftEnsemble, resolve_checkpoints
+from inference_build import synthetic_inputs
+
+MODEL_PATH = os.path.join(BASE_DIR, "TrainedTransformer/model_epoch_20.pt")
+VOCAB_PATH = os.path.join(BASE_DIR, "TrainedTransformer/vocab.json")
+CLASS_DB_PATH = os.path.join(BASE_DIR, "TrainedTransformer/champion_classes.json")
+MODEL_BUNDLE_PATH = os.getenv("MODEL_BUNDLE", os.path.join(BASE_DIR, "TrainedTransformer/draft_bundle"))
+
+BATCH_SIZES = (1, 5, 32)
+SEQ_LENGTHS = (1, 6, 13, 20)
+ATOL = 1e-4
+RTOL = 1e-4
+
+
+def check_ensemble(members, vocab_size):
+    """Asserts member-wise and mean parity for every (length, batch size). Returns the max |diff|."""
+    ensemble = DraftEnsemble(members)
+    max_diff = 0.0
+    with torch.no_grad():
+        for seq_len in SEQ_LENGTHS:
+            for batch_size in BATCH_SIZES:
+                ctx_data, seq_data, target_idx = synthetic_inputs(vocab_size, batch_size, seq_len, 'cpu', seed=2)
+                expected = torch.stack([m.predict_at(ctx_data, seq_data, target_idx) for m in members])
+                per_member = ensemble.member_logits(ctx_data, seq_data, target_idx)
+                mean = ensemble.predict_at(ctx_data, seq_data, target_idx)
+                for actual, reference, what in ((per_member, expected, 'member logits'),
+                                                (mean, expected.mean(dim=0), 'mean logits')):
+                    assert actual.shape == reference.shape, (what, seq_len, batch_size, actual.shape)
+                    diff = (actual - reference).abs().max().item()
+                    assert torch.allclose(actual, reference, atol=ATOL, rtol=RTOL), \
+                        f"{what} differ at length {seq_len}, B={batch_size}: max |diff| = {diff:.2e}"
+                    max_diff = max(max_diff, diff)
+    return max_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stacked-weight ensemble vs per-checkpoint parity test")
+    parser.add_argument("--checkpoints", default=os.getenv("ENSEMBLE_CHECKPOINTS") or "model_epoch_1[8-9].pt,model_epoch_20.pt",
+                        help="Comma-separated checkpoints / globs relative to the bundle's weights")
+    args = parser.parse_args()
+
+    bundle = open_bundle(MODEL_BUNDLE_PATH, MODEL_PATH, VOCAB_PATH, CLASS_DB_PATH, device='cpu')
+    paths = resolve_checkpoints(args.checkpoints, os.path.dirname(bundle.weights_path))
+    members = [bundle.model_from_checkpoint(p) for p in paths]
+    try:
+        max_diff = check_ensemble(members, len(bundle.tokenizer.vocab))
+    except AssertionError as e:
+        print(f"❌ ensemble of {len(members)}: {e}")
+        sys.exit(1)
+    print(f"✅ ensemble of {len(members)} ({', '.join(os.path.basename(p) for p in paths)}) matches its members "
+          f"for lengths {SEQ_LENGTHS} x B={BATCH_SIZES} (max |diff| = {max_diff:.2e})")
+
+
+if __name__ == "__main__":
+    main()
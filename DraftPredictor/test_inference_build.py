@@ -0,0 +1,80 @@
+"""
+Parity test for the compiled inference builds (inference_build.py).
+
+    python test_inference_build.py [--modes trace compile]
+
+Builds each mode from the served weights and checks it against the eager model's predict_at for every
+length bucket at B=1 and B=5: at the bucket length (static-shape builds are always fed padded buckets)
+and, for dynamic-shape builds, one step shorter. A build that falls back to eager counts as a failure.
+"""
+import argparse
+import os
+import sys
+
+import torch
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'TrainedTransformer'))
+
+from bundle import open_bundle
+from inference_build import CompiledPredictor, build_inference_model, synthetic_inputs, LENGTH_BUCKETS
+
+MODEL_PATH = os.path.join(BASE_DIR, "TrainedTransformer/model_epoch_20.pt")
+VOCAB_PATH = os.path.join(BASE_DIR, "TrainedTransformer/vocab.json")
+CLASS_DB_PATH = os.path.join(BASE_DIR, "TrainedTransformer/champion_classes.json")
+MODEL_BUNDLE_PATH = os.getenv("MODEL_BUNDLE", os.path.join(BASE_DIR, "TrainedTransformer/draft_bundle"))
+
+BATCH_SIZES = (1, 5)
+ATOL = 1e-4
+RTOL = 1e-4
+
+
+def load_eager_model():
+    bundle = open_bundle(MODEL_BUNDLE_PATH, MODEL_PATH, VOCAB_PATH, CLASS_DB_PATH, device='cpu')
+    return bundle.model, len(bundle.tokenizer.vocab)
+
+
+def check_build(mode, model, vocab_size):
+    """Asserts that `mode` builds and matches eager on every (bucket, batch size). Returns the max |diff|."""
+    warmup_shapes = [(b, t) for t in LENGTH_BUCKETS for b in BATCH_SIZES]
+    predictor = build_inference_model(model, mode, vocab_size, 'cpu', warmup_shapes)
+    assert isinstance(predictor, CompiledPredictor), f"'{mode}' build fell back to the eager model"
+
+    max_diff = 0.0
+    with torch.no_grad():
+        for bucket in LENGTH_BUCKETS:
+            lengths = [bucket] if predictor.static_shapes else [bucket, bucket - 1]
+            for seq_len in lengths:
+                for batch_size in BATCH_SIZES:
+                    # Different seed than the build's own warmup / self-check
+                    ctx_data, seq_data, target_idx = synthetic_inputs(vocab_size, batch_size, seq_len, 'cpu', seed=1)
+                    expected = model.predict_at(ctx_data, seq_data, target_idx)
+                    actual = torch.as_tensor(predictor.predict_at(ctx_data, seq_data, target_idx))
+                    assert actual.shape == expected.shape, (mode, seq_len, batch_size, actual.shape)
+                    assert torch.allclose(actual, expected, atol=ATOL, rtol=RTOL), \
+                        f"'{mode}' differs from eager at length {seq_len}, B={batch_size}: " \
+                        f"max |diff| = {(actual - expected).abs().max().item():.2e}"
+                    max_diff = max(max_diff, (actual - expected).abs().max().item())
+    return max_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled inference build vs eager parity test")
+    parser.add_argument("--modes", nargs="+", default=["trace", "compile"], choices=["trace", "compile"])
+    args = parser.parse_args()
+
+    model, vocab_size = load_eager_model()
+    failed = False
+    for mode in args.modes:
+        try:
+            max_diff = check_build(mode, model, vocab_size)
+            print(f"✅ {mode}: matches eager for buckets {LENGTH_BUCKETS} x B={BATCH_SIZES} (max |diff| = {max_diff:.2e})")
+        except AssertionError as e:
+            print(f"❌ {mode}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
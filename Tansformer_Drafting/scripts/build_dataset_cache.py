@@ -0,0 +1,40 @@
+
+import argparse
+import os
+import sys
+
+# Add src to path
+sys.path.append(os.getcwd())
+
+from src.tokenizer import DraftTokenizer
+from src.dataset import DraftDataset
+
+def build_cache():
+    """
+    One-time tokenization of the split files into the memory-mapped cache DraftDataset reads from.
+    Safe to re-run: a split is only re-tokenized when its JSON, the vocab or the class DB changed.
+    """
+    parser = argparse.ArgumentParser(description="Pre-tokenize the split JSON files into the dataset cache")
+    parser.add_argument("--vocab", default="Data/metadata/vocab.json")
+    parser.add_argument("--classes", default="champion_classes.json")
+    parser.add_argument("--max-len", type=int, default=21)
+    parser.add_argument("--cache-dir", default=None, help="Default: <split dir>/cache")
+    parser.add_argument("splits", nargs="*", default=[
+        "Data/processed/train_games.json",
+        "Data/processed/val_games.json",
+        "Data/processed/test_games.json"
+    ])
+    args = parser.parse_args()
+
+    class_db = args.classes if os.path.exists(args.classes) else None
+    tokenizer = DraftTokenizer(args.vocab, class_db)
+
+    for path in args.splits:
+        if not os.path.exists(path):
+            print(f"⚠️ Skipping missing split {path}")
+            continue
+        ds = DraftDataset(path, tokenizer, max_len=args.max_len, cache_dir=args.cache_dir)
+        print(f"   {path}: {len(ds)} games")
+
+if __name__ == "__main__":
+    build_cache()
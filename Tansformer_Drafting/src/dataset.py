@@ -1,46 +1,235 @@
 import torch
-from torch.utils.data import Dataset
+from torch.utils.data import Dataset, default_collate
+import numpy as np
 import pandas as pd
+import hashlib
 import json
+import os
+import shutil
+
+# Bump when the cached arrays change layout or meaning (invalidates every cache)
+CACHE_VERSION = 1
+CACHE_ARRAYS = ('champ_ids', 'action_ids', 'team_ids', 'pos_ids', 'class_bits')
+CACHE_META = 'meta.json'
+
+
+def default_cache_dir(file_path):
+    """Data/processed/train_games.json -> Data/processed/cache"""
+    return os.path.join(os.path.dirname(os.path.abspath(file_path)), 'cache')
+
+
+def dataset_cache_key(file_path, tokenizer, max_len):
+    """
+    Hash of everything the tokenized arrays depend on: the source JSON bytes, the vocab,
+    the class table built from champion_classes.json, max_len and CACHE_VERSION.
+    """
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    h.update(json.dumps(tokenizer.vocab, sort_keys=True).encode())
+    if tokenizer.class_table is not None:
+        h.update(np.asarray(tokenizer.class_table, dtype=np.float32).tobytes())
+    h.update(f"v{CACHE_VERSION}:max_len={max_len}".encode())
+    return h.hexdigest()[:16]
+
 
 class DraftDataset(Dataset):
-    def __init__(self, file_path, tokenizer, max_len=21):
+    def __init__(self, file_path, tokenizer, max_len=21, compact=True, cache_dir=None):
         """
         Args:
             file_path (str): Path to the specific JSON file (e.g., 'Data/processed/train_games.json').
             tokenizer (DraftTokenizer): Instance of tokenizer.
             max_len (int): Max sequence length.
+            compact (bool): Tokenize every game once at load into contiguous NumPy arrays
+                (int16 champion ids, uint8 action / team / position / class bitmask) and drop the JSON.
+                False keeps the parsed JSON and re-encodes each game in __getitem__ (legacy).
+            cache_dir (str | None | False): Where compact arrays are cached as memory-mapped .npy files,
+                keyed by dataset_cache_key (rebuilt only when the JSON, vocab or class DB change).
+                None = default_cache_dir(file_path), False = no cache.
         """
         self.tokenizer = tokenizer
         self.max_len = max_len
+        self.compact = compact
+        
+        # [vocab, 6] class table (if the tokenizer loaded champion_classes.json):
+        # class_vecs become a single gather on champ_ids, identical to serving.
+        self.class_table = None
+        if tokenizer.class_table is not None:
+            self.class_table = torch.tensor(tokenizer.class_table, dtype=torch.float)
+        
+        # bitmask -> multi-hot rows, so decoding the class bitmask is one gather
+        bits = torch.arange(1 << tokenizer.num_classes).unsqueeze(1)
+        self.bitmask_table = ((bits >> torch.arange(tokenizer.num_classes)) & 1).float()
+        
+        cache_path = None
+        if compact and cache_dir is not False:
+            cache_dir = cache_dir or default_cache_dir(file_path)
+            stem = os.path.splitext(os.path.basename(file_path))[0]
+            cache_path = os.path.join(cache_dir, f"{stem}-{dataset_cache_key(file_path, tokenizer, max_len)}")
+            if self._load_cache(cache_path):
+                self.data = None
+                print(f"⚡ Loaded {len(self.champ_ids)} tokenized games from cache {cache_path}")
+                return
         
         # Load Data directly
         with open(file_path, 'r') as f:
             self.data = json.load(f)
             
         print(f"✅ Loaded {len(self.data)} games from {file_path}")
+        
+        if compact:
+            self._build_arrays()
+            self.data = None
+            if cache_path:
+                self._save_cache(cache_path)
 
-    def __len__(self):
-        return len(self.data)
-
-    def __getitem__(self, idx):
-        game_data = self.data[idx]
+    def _build_arrays(self):
+        """Encodes every game once into [N, max_len] arrays (see compact in __init__)."""
+        n = len(self.data)
+        self.champ_ids = np.zeros((n, self.max_len), dtype=np.int16)
+        self.action_ids = np.zeros((n, self.max_len), dtype=np.uint8)
+        self.team_ids = np.zeros((n, self.max_len), dtype=np.uint8)
+        self.pos_ids = np.zeros((n, self.max_len), dtype=np.uint8)
+        self.class_bits = np.zeros((n, self.max_len), dtype=np.uint8)  # bit c = class c (per-step JSON classes)
         
-        # New Minimal Schema: 'draft' key
-        # Legacy: 'current_draft'
-        history = game_data.get('draft', game_data.get('current_draft', []))
+        for i, game_data in enumerate(self.data):
+            encoded = self.tokenizer.encode(self._context(), self._history(game_data), max_len=self.max_len)
+            seq = encoded['sequence']
+            self.champ_ids[i] = seq['champion_ids']
+            self.action_ids[i] = seq['action_ids']
+            self.team_ids[i] = seq['team_ids']
+            self.pos_ids[i] = seq['position_ids']
+            self.class_bits[i] = [
+                sum(1 << c for c in set(c_ids) if 0 <= c < self.tokenizer.num_classes)
+                for c_ids in seq['class_ids_list']
+            ]
         
+        # Context is the same generic token for every game
+        ctx = self.tokenizer.encode(self._context(), [], max_len=self.max_len)['context']
+        self.context_ids = (ctx['blue_team_id'], ctx['red_team_id'], ctx['game_num'])
+
+    def _load_cache(self, cache_path):
+        """Memory-maps the cached arrays. False if there is no complete cache at cache_path."""
+        meta_path = os.path.join(cache_path, CACHE_META)
+        if not os.path.exists(meta_path):
+            return False
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            # 'c' = copy-on-write: pages are shared between DataLoader workers, tensors stay writable
+            arrays = {name: np.load(os.path.join(cache_path, f"{name}.npy"), mmap_mode='c') for name in CACHE_ARRAYS}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable dataset cache {cache_path}: {e}")
+            return False
+        for name, arr in arrays.items():
+            setattr(self, name, arr)
+        self.context_ids = tuple(meta['context_ids'])
+        return True
+
+    def _save_cache(self, cache_path):
+        """Writes the arrays to cache_path (atomically) and removes stale caches of the same file."""
+        cache_dir = os.path.dirname(cache_path)
+        stem = os.path.basename(cache_path).rsplit('-', 1)[0]
+        tmp_path = f"{cache_path}.tmp{os.getpid()}"
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            for name in CACHE_ARRAYS:
+                np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(self, name))
+            with open(os.path.join(tmp_path, CACHE_META), 'w') as f:
+                json.dump({'version': CACHE_VERSION, 'games': len(self.champ_ids),
+                           'max_len': self.max_len, 'context_ids': list(self.context_ids)}, f)
+            shutil.rmtree(cache_path, ignore_errors=True)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"⚠️ Could not write dataset cache {cache_path}: {e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        
+        for entry in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, entry)
+            if entry != os.path.basename(cache_path) and '.tmp' not in entry and entry.rsplit('-', 1)[0] == stem and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+        print(f"💾 Cached tokenized games to {cache_path}")
+
+    @staticmethod
+    def _context():
         # Context (Minimal)
         # We don't have team names anymore.
         # Pass generic context.
-        ctx = {
+        return {
             "blue_team": "BLUE",
             "red_team": "RED",
             "game_in_series": 1 # Default or from data if available
         }
+
+    @staticmethod
+    def _history(game_data):
+        # New Minimal Schema: 'draft' key
+        # Legacy: 'current_draft'
+        return game_data.get('draft', game_data.get('current_draft', []))
+
+    def __len__(self):
+        return len(self.champ_ids) if self.compact else len(self.data)
+
+    def _compact_item(self, idx):
+        champ_ids = torch.from_numpy(self.champ_ids[idx]).long()
+        if self.class_table is not None:
+            class_tensor = self.class_table[champ_ids]
+        else:
+            class_tensor = self.bitmask_table[torch.from_numpy(self.class_bits[idx]).long()]
+        blue_id, red_id, game_num = self.context_ids
+        return {
+            'context_blue': torch.tensor(blue_id, dtype=torch.long),
+            'context_red': torch.tensor(red_id, dtype=torch.long),
+            'context_game': torch.tensor(game_num, dtype=torch.long),
+            'champ_ids': champ_ids,
+            'action_ids': torch.from_numpy(self.action_ids[idx]).long(),
+            'team_ids': torch.from_numpy(self.team_ids[idx]).long(),
+            'pos_ids': torch.from_numpy(self.pos_ids[idx]).long(),
+            'class_vecs': class_tensor,
+            'labels': champ_ids.clone()
+        }
+
+    def get_batch(self, indices):
+        """
+        Batched collate: builds the [B, ...] tensors with one array slice per feature instead of
+        B __getitem__ calls + default_collate. Same dict as DataLoader(batch_size=B) over single items.
+        """
+        if not self.compact:
+            return default_collate([self[i] for i in indices])
+        idx = np.asarray(indices, dtype=np.int64)
+        champ_ids = torch.from_numpy(self.champ_ids[idx].astype(np.int64))
+        if self.class_table is not None:
+            class_tensor = self.class_table[champ_ids]
+        else:
+            class_tensor = self.bitmask_table[torch.from_numpy(self.class_bits[idx].astype(np.int64))]
+        blue_id, red_id, game_num = self.context_ids
+        n = len(idx)
+        return {
+            'context_blue': torch.full((n,), blue_id, dtype=torch.long),
+            'context_red': torch.full((n,), red_id, dtype=torch.long),
+            'context_game': torch.full((n,), game_num, dtype=torch.long),
+            'champ_ids': champ_ids,
+            'action_ids': torch.from_numpy(self.action_ids[idx].astype(np.int64)),
+            'team_ids': torch.from_numpy(self.team_ids[idx].astype(np.int64)),
+            'pos_ids': torch.from_numpy(self.pos_ids[idx].astype(np.int64)),
+            'class_vecs': class_tensor,
+            'labels': champ_ids.clone()
+        }
+
+    def __getitem__(self, idx):
+        # A list of indices (from a BatchSampler) returns a whole collated batch
+        if isinstance(idx, (list, tuple, np.ndarray)):
+            return self.get_batch(idx)
+        if self.compact:
+            return self._compact_item(idx)
+        
+        game_data = self.data[idx]
+        history = self._history(game_data)
         
         # Tokenize (returns dict of lists)
-        encoded = self.tokenizer.encode(ctx, history, max_len=self.max_len)
+        encoded = self.tokenizer.encode(self._context(), history, max_len=self.max_len)
 
         
         # Unpack Features
@@ -60,17 +249,22 @@ class DraftDataset(Dataset):
         pos_ids = torch.tensor(seq['position_ids'], dtype=torch.long)
         
         # Class Multi-Hot Encoding
-        # seq['class_ids_list'] is List[List[int]] len=MaxLen
-        class_ids_list = seq['class_ids_list']
-        num_classes = 6 # Known fixed size from Tokenizer
-        
-        # Create FloatTensor (MaxLen, NumClasses)
-        class_tensor = torch.zeros((len(class_ids_list), num_classes), dtype=torch.float)
-        
-        for t_step, c_ids in enumerate(class_ids_list):
-            for cid in c_ids:
-                if 0 <= cid < num_classes:
-                    class_tensor[t_step, cid] = 1.0
+        if self.class_table is not None:
+            # Single gather from the precomputed table -> (MaxLen, NumClasses)
+            class_tensor = self.class_table[champ_ids]
+        else:
+            # Legacy: per-step 'champion_classes' from the JSON
+            # seq['class_ids_list'] is List[List[int]] len=MaxLen
+            class_ids_list = seq['class_ids_list']
+            num_classes = 6 # Known fixed size from Tokenizer
+            
+            # Create FloatTensor (MaxLen, NumClasses)
+            class_tensor = torch.zeros((len(class_ids_list), num_classes), dtype=torch.float)
+            
+            for t_step, c_ids in enumerate(class_ids_list):
+                for cid in c_ids:
+                    if 0 <= cid < num_classes:
+                        class_tensor[t_step, cid] = 1.0
         
         # TARGET: The Champion ID at each step.
         # For auto-regressive training:
@@ -82,48 +276,8 @@ class DraftDataset(Dataset):
         # The Model will internally shift (Masking).
         labels = champ_ids.clone()
         
-        # CONSTRAINT MASK
-        # For each step T, we need a mask of valid champions.
-        # This is expensive to compute for every step in a batch.
-        # Optim: We only really need it for inference or detailed Eval.
-        # For training Loss, we just want CrossEntropy on the Correct Target.
-        # If the Target is valid, Loss is fine.
-        # We can IGNORE the constraint mask during training for speed, 
-        # OR we compute it to penalize invalid predictions explicitly?
-        # Standard GPT training does NOT use a constraint mask in Loss. 
-        # It just learns not to predict tokens that never appear in that context.
-        # We will Return the Mask for potential use, but keep it simple.
-        
-
-        # CONSTRAINT MASK
-        # Shape: (SeqLen, VocabSize)
-        # We want to mask unavailable champions (already picked/banned).
-        vocab_size = len(self.tokenizer.vocab)
-        constraint_mask = torch.zeros((len(champ_ids), vocab_size), dtype=torch.float)
-        
-        # Track unavailable tokens (initially empty or special tokens?)
-        # For simplicity, we only mask champions that appear in the sequence.
-        unavailable = set()
-        
-        # Iterate through steps
-        for i in range(len(champ_ids)):
-            # 1. Apply current unavailability to this step's mask
-            if unavailable:
-                # Convert set to tensor indices
-                unavail_indices = list(unavailable)
-                # Set to -inf
-                constraint_mask[i, unavail_indices] = float('-inf')
-            
-            # 2. Update unavailability for NEXT step
-            # The champion at this input step is now taken.
-            c_id = champ_ids[i].item()
-            # Don't mask special tokens if they appear (like PAD or placeholders)
-            # Assuming champ IDs > some threshold?
-            # Or just checking if it is a champion.
-            # Simple check: if it's not PAD/UNK etc.
-            # But simpler: Just add it. If we mask PAD, it handles itself.
-            if c_id != self.tokenizer.pad_token_id:
-                unavailable.add(c_id)
+        # No constraint mask: "already taken" masking is computed per batch from champ_ids
+        # (constraints.cumulative_seen_mask) where it is needed, instead of a [SeqLen, Vocab] tensor per sample.
         
         return {
             'context_blue': blue_id,
@@ -134,6 +288,5 @@ class DraftDataset(Dataset):
             'team_ids': team_ids,
             'pos_ids': pos_ids,
             'class_vecs': class_tensor, 
-            'constraint_mask': constraint_mask, # New
             'labels': labels
         }
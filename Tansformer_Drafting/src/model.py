@@ -1,5 +1,6 @@
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import math
 
 class FeatureEmbedding(nn.Module):
@@ -27,6 +28,10 @@ class FeatureEmbedding(nn.Module):
         # Class Projection: Multi-Hot (6) -> 32
         self.class_proj = nn.Linear(self.num_classes, self.d_class)
         
+        # Champion -> Class Multi-Hot lookup table [vocab, 6] (filled by set_class_table).
+        # Non-persistent: checkpoints are unchanged and it stays all-zeros until a table is set.
+        self.register_buffer('class_table', torch.zeros(vocab_size, self.num_classes), persistent=False)
+        
         # Context Token Embeddings (Token 0)
         self.d_ctx_team = 64
         self.d_ctx_game = 16
@@ -36,12 +41,17 @@ class FeatureEmbedding(nn.Module):
         self.ctx_proj = nn.Linear(self.d_ctx_team * 2 + self.d_ctx_game, d_model) 
         self.seq_proj = nn.Linear(total_input_dim, d_model) 
         
-    def forward(self, ctx_data, seq_data):
+    def set_class_table(self, table):
+        """table: [vocab, 6] multi-hot (e.g. DraftTokenizer.class_table)."""
+        table = torch.as_tensor(table, dtype=torch.float)
+        rows = min(table.size(0), self.class_table.size(0))
+        self.class_table.zero_()
+        self.class_table[:rows].copy_(table[:rows])
+
+    def embed_context(self, ctx_data):
         """
-        ctx_data: {blue: [B], red: [B], game: [B]}
-        seq_data: {champ: [B, T], action: [B, T], team: [B, T], pos: [B, T], class_vecs: [B, T, 6]}
+        ctx_data: {blue: [B], red: [B], game: [B]} -> Context Token [B, 1, d_model]
         """
-        # 1. Context Token (Step 0)
         b_team = self.emb_ctx_team(ctx_data['context_blue'])
         r_team = self.emb_ctx_team(ctx_data['context_red'])
         g_num = self.emb_ctx_game(ctx_data['context_game'])
@@ -49,9 +59,14 @@ class FeatureEmbedding(nn.Module):
         # Concat [B, 144]
         ctx_cat = torch.cat([b_team, r_team, g_num], dim=-1)
         # Project [B, d_model] -> [B, 1, d_model]
-        ctx_emb = self.ctx_proj(ctx_cat).unsqueeze(1)
-        
-        # 2. Sequence Tokens (Steps 1..N)
+        return self.ctx_proj(ctx_cat).unsqueeze(1)
+
+    def embed_sequence(self, seq_data):
+        """
+        seq_data: {champ: [B, T], action: [B, T], team: [B, T], pos: [B, T], class_vecs: [B, T, 6]}
+        -> Sequence Tokens [B, T, d_model]
+        class_vecs is optional: if absent it is gathered from the class table by champ_ids.
+        """
         # Embed each feature
         e_champ = self.emb_champ(seq_data['champ_ids'])
         e_act = self.emb_action(seq_data['action_ids'])
@@ -60,12 +75,26 @@ class FeatureEmbedding(nn.Module):
         
         # Class Embedding
         # seq_data['class_vecs'] is [B, T, 6] Float
-        e_class = self.class_proj(seq_data['class_vecs']) # -> [B, T, 32]
+        class_vecs = seq_data.get('class_vecs')
+        if class_vecs is None:
+            class_vecs = self.class_table[seq_data['champ_ids']] # single gather
+        e_class = self.class_proj(class_vecs) # -> [B, T, 32]
         
         # Concat [B, T, TotalDim]
         seq_cat = torch.cat([e_champ, e_act, e_team, e_pos, e_class], dim=-1)
         # Project [B, T, d_model]
-        seq_emb = self.seq_proj(seq_cat)
+        return self.seq_proj(seq_cat)
+
+    def forward(self, ctx_data, seq_data):
+        """
+        ctx_data: {blue: [B], red: [B], game: [B]}
+        seq_data: {champ: [B, T], action: [B, T], team: [B, T], pos: [B, T], class_vecs: [B, T, 6]}
+        """
+        # 1. Context Token (Step 0)
+        ctx_emb = self.embed_context(ctx_data)
+        
+        # 2. Sequence Tokens (Steps 1..N)
+        seq_emb = self.embed_sequence(seq_data)
         
         # 3. Combine [B, 1+T, d_model]
         # We prepend Context
@@ -73,6 +102,31 @@ class FeatureEmbedding(nn.Module):
         
         return full_emb
 
+class DraftKVCache:
+    """
+    Per-layer key/value cache for incremental (token-by-token) decoding.
+    keys[i] / values[i]: [B, nhead, L, head_dim] for encoder layer i.
+    Instances are never mutated in place, so one cache can be shared and extended by several callers.
+    """
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+
+    @property
+    def length(self):
+        return self.keys[0].size(2) if self.keys else 0
+
+    @property
+    def batch_size(self):
+        return self.keys[0].size(0) if self.keys else 0
+
+    def expand(self, batch_size):
+        """Broadcasts a B=1 cache to batch_size rows (e.g. to score several continuations of one prefix)."""
+        return DraftKVCache(
+            [k.expand(batch_size, -1, -1, -1) for k in self.keys],
+            [v.expand(batch_size, -1, -1, -1) for v in self.values]
+        )
+
 class DraftTransformer(nn.Module):
     def __init__(self, vocab_size, team_vocab_size=100, d_model=256, nhead=8, num_layers=6, dropout=0.1):
         super().__init__()
@@ -88,7 +142,17 @@ class DraftTransformer(nn.Module):
         
         self.output_head = nn.Linear(d_model, vocab_size)
         
-    def forward(self, ctx_data, seq_data, src_key_padding_mask=None):
+        # Causal mask for the longest sequence (Context + 21 steps), cropped per call.
+        # Non-persistent so checkpoints are unchanged.
+        self.max_seq_len = 22
+        self.register_buffer('causal_mask', self.generate_square_subsequent_mask(self.max_seq_len), persistent=False)
+        
+    def set_class_table(self, table):
+        """Installs the champion -> class multi-hot table used when class_vecs is not provided."""
+        self.embedding.set_class_table(table)
+
+    def forward_hidden(self, ctx_data, seq_data, src_key_padding_mask=None):
+        """Runs embedding + encoder and returns the hidden states [B, T+1, D] (no output head)."""
         # Embed
         src = self.embedding(ctx_data, seq_data) # [B, T+1, D]
         
@@ -98,19 +162,146 @@ class DraftTransformer(nn.Module):
         # Causal Mask (Autoregressive)
         # We want to predict Step N using Steps 0..N.
         # So position I can attend to <= I.
+        # Dynamic-length inputs just crop the precomputed mask.
         sz = src.size(1)
-        mask = self.generate_square_subsequent_mask(sz).to(src.device)
+        if sz <= self.max_seq_len:
+            mask = self.causal_mask[:sz, :sz]
+        else:
+            mask = self.generate_square_subsequent_mask(sz).to(src.device)
         
-        output = self.transformer_encoder(src, mask=mask, src_key_padding_mask=src_key_padding_mask)
+        return self.transformer_encoder(src, mask=mask, src_key_padding_mask=src_key_padding_mask)
+
+    def forward(self, ctx_data, seq_data, src_key_padding_mask=None):
+        output = self.forward_hidden(ctx_data, seq_data, src_key_padding_mask)
         
         # Logits [B, T+1, Vocab]
         logits = self.output_head(output)
         
         return logits
 
+    def predict_at(self, ctx_data, seq_data, target_idx):
+        """
+        Inference entry point: projects ONLY the hidden state at target_idx of each row through the
+        output head, instead of building the full [B, T+1, Vocab] logits tensor.
+        target_idx: [B] LongTensor (or int) of positions to score (len(history) for next-step prediction).
+        Returns logits [B, Vocab].
+        """
+        output = self.forward_hidden(ctx_data, seq_data)
+        rows = torch.arange(output.size(0), device=output.device)
+        if not torch.is_tensor(target_idx):
+            target_idx = torch.full((output.size(0),), int(target_idx), dtype=torch.long)
+        return self.output_head(output[rows, target_idx.to(output.device)])
+
+    def forward_incremental(self, ctx_data=None, seq_data=None, cache=None, last_only=False):
+        """
+        Incremental inference: encodes only the NEW tokens and attends over the cached keys/values.
+        
+        cache=None starts a new draft: ctx_data is required and the Context Token is prepended.
+        seq_data holds the new draft steps only ([B, n] / [B, n, 6]); it may be None when starting.
+        
+        Returns (logits [B, n_new, Vocab], updated DraftKVCache). logits[:, -1] is the prediction for
+        the step after the last token fed, i.e. the same row the full forward produces at target_idx.
+        last_only=True projects only that last position through the output head ([B, 1, Vocab]).
+        Equivalent to forward() for the causal model (eval mode).
+        """
+        parts = []
+        if cache is None:
+            parts.append(self.embedding.embed_context(ctx_data))
+        if seq_data is not None and seq_data['champ_ids'].size(1) > 0:
+            parts.append(self.embedding.embed_sequence(seq_data))
+        x = torch.cat(parts, dim=1) if len(parts) > 1 else parts[0]
+        
+        past_len = cache.length if cache is not None else 0
+        new_len = x.size(1)
+        
+        # Positional Encoding for the absolute positions past_len .. past_len + n_new
+        x = x + self.pos_encoder.pe[past_len:past_len + new_len].transpose(0, 1)
+        x = self.pos_encoder.dropout(x)
+        
+        # Causal Mask from the cache length: new token i sees every cached token and new tokens <= i.
+        mask = torch.triu(
+            torch.full((new_len, past_len + new_len), float('-inf'), device=x.device),
+            diagonal=past_len + 1
+        )
+        
+        new_keys, new_values = [], []
+        for i, layer in enumerate(self.transformer_encoder.layers):
+            attn = layer.self_attn
+            bsz = x.size(0)
+            head_dim = attn.embed_dim // attn.num_heads
+            
+            # Project Q/K/V with the layer's own packed in-projection (a Linear module once quantized)
+            in_proj = getattr(attn, 'in_proj', None)
+            qkv = in_proj(x) if in_proj is not None else F.linear(x, attn.in_proj_weight, attn.in_proj_bias)
+            q, k, v = qkv.chunk(3, dim=-1)
+            q, k, v = [t.view(bsz, new_len, attn.num_heads, head_dim).transpose(1, 2) for t in (q, k, v)]
+            
+            if cache is not None:
+                k = torch.cat([cache.keys[i].expand(bsz, -1, -1, -1), k], dim=2)
+                v = torch.cat([cache.values[i].expand(bsz, -1, -1, -1), v], dim=2)
+            new_keys.append(k)
+            new_values.append(v)
+            
+            attn_out = F.scaled_dot_product_attention(q, k, v, attn_mask=mask)
+            attn_out = attn.out_proj(attn_out.transpose(1, 2).reshape(bsz, new_len, attn.embed_dim))
+            
+            # Post-Norm Encoder Layer (norm_first=False, matches nn.TransformerEncoderLayer defaults)
+            x = layer.norm1(x + layer.dropout1(attn_out))
+            ff = layer.linear2(layer.dropout(layer.activation(layer.linear1(x))))
+            x = layer.norm2(x + layer.dropout2(ff))
+        
+        if self.transformer_encoder.norm is not None:
+            x = self.transformer_encoder.norm(x)
+        
+        if last_only:
+            x = x[:, -1:]
+        logits = self.output_head(x)
+        return logits, DraftKVCache(new_keys, new_values)
+
     def generate_square_subsequent_mask(self, sz: int) -> torch.Tensor:
         return torch.triu(torch.full((sz, sz), float('-inf')), diagonal=1)
 
+def load_state_dict_mmap(checkpoint_path):
+    """
+    Loads a checkpoint state dict memory-mapped: tensors are backed by the file's pages (read lazily,
+    shared read-only by every process mapping the same file) instead of a private in-memory copy.
+    Falls back to a regular load for legacy (non-zipfile) checkpoints.
+    """
+    try:
+        return torch.load(checkpoint_path, map_location='cpu', mmap=True, weights_only=True)
+    except RuntimeError:
+        return torch.load(checkpoint_path, map_location='cpu', weights_only=True)
+
+def load_draft_model(checkpoint_path, vocab_size, team_vocab_size, device='cpu', **model_kwargs):
+    """
+    Fast-start inference loading: the memory-mapped checkpoint tensors are assigned as the model's
+    parameters (assign=True, no copy), so the weights live once, in the shared page cache; the
+    freshly initialised parameters are released as they are replaced.
+    The model is not built on the meta device: meta kernels lazily import torch._dynamo (~1.5s),
+    far more than initialising this model on CPU.
+    Moving to a non-CPU device copies the weights as usual. Returns the model in eval mode.
+    """
+    model = DraftTransformer(vocab_size, team_vocab_size, **model_kwargs)
+    model.load_state_dict(load_state_dict_mmap(checkpoint_path), assign=True)
+    return model.to(device).eval()
+
+class DraftInferenceModule(nn.Module):
+    """
+    Tensor-only wrapper around DraftTransformer.predict_at (no dict inputs), so the inference path
+    can be traced / scripted / compiled / exported. Class features come from the model's class table.
+    """
+    INPUT_NAMES = ('context_blue', 'context_red', 'context_game',
+                   'champ_ids', 'action_ids', 'team_ids', 'pos_ids', 'target_idx')
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, context_blue, context_red, context_game, champ_ids, action_ids, team_ids, pos_ids, target_idx):
+        ctx_data = {'context_blue': context_blue, 'context_red': context_red, 'context_game': context_game}
+        seq_data = {'champ_ids': champ_ids, 'action_ids': action_ids, 'team_ids': team_ids, 'pos_ids': pos_ids}
+        return self.model.predict_at(ctx_data, seq_data, target_idx)
+
 # Re-keeping the Helper for completeness (referenced in __init__)
 class PositionalEncoding(nn.Module):
     def __init__(self, d_model: int, dropout: float = 0.1, max_len: int = 5000):
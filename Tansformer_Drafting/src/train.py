@@ -1,15 +1,20 @@
 
 import os
+import argparse
+import json
+import time
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, BatchSampler, RandomSampler, SequentialSampler
 from tqdm import tqdm
 import math
 
 from src.tokenizer import DraftTokenizer
 from src.dataset import DraftDataset
 from src.model import DraftTransformer
+from src.bundle import save_bundle
+from src.constraints import cumulative_seen_mask
 
 # --- Config ---
 def get_config():
@@ -18,6 +23,7 @@ def get_config():
     BATCH_SIZE = 32
     LEARNING_RATE = 1e-4 
     VOCAB_PATH = "Data/metadata/vocab.json"
+    CLASS_PATH = "champion_classes.json"
     # Using specific split files now
     TRAIN_PATH = "Data/processed/train_games.json"
     VAL_PATH = "Data/processed/val_games.json"
@@ -30,16 +36,209 @@ def get_config():
         'batch_size': BATCH_SIZE,
         'lr': LEARNING_RATE,
         'vocab_path': VOCAB_PATH,
+        'class_path': CLASS_PATH,
         'train_path': TRAIN_PATH,
         'val_path': VAL_PATH,
         'checkpoint_dir': CHECKPOINT_DIR,
         'device': DEVICE,
         'd_model': 256, # Preserving original model config
         'n_layers': 6,
-        'n_heads': 8
+        'n_heads': 8,
+        # DataLoader: single-process batched loading by default (one fancy-index per batch, no worker start-up).
+        # num_workers 'auto' (--num-workers auto) probes loader_candidates() on the train set and keeps the
+        # fastest; the result is cached in <checkpoint_dir>/loader_probe.json per dataset / batch size / device.
+        'num_workers': 0,
+        'prefetch_factor': 2,
+        'persistent_workers': True,
+        'pin_memory': DEVICE.type == 'cuda',
+        'batched_collate': True,
+        'probe_batches': 50,
+        # Mixed precision (--amp): bf16 autocast on CPU; bf16 on CUDA if supported, else fp16 + grad scaling
+        'amp': False,
+        'amp_dtype': 'auto'
     }
     return config
 
+def amp_settings(config):
+    """(enabled, autocast dtype, use GradScaler) for config['amp'] on config['device']."""
+    device = config['device']
+    if not config['amp']:
+        return False, torch.float32, False
+    if device.type == 'cpu':
+        return True, torch.bfloat16, False
+    if device.type == 'cuda':
+        dtype = config['amp_dtype']
+        if dtype == 'auto':
+            dtype = 'bf16' if torch.cuda.is_bf16_supported() else 'fp16'
+        if dtype == 'fp16':
+            return True, torch.float16, True
+        return True, torch.bfloat16, False
+    print(f"⚠️ --amp is not supported on {device.type}, training in fp32")
+    return False, torch.float32, False
+
+def make_optimizer(model, lr, fused):
+    """
+    fused=False: the original AdamW (the fp32 baseline). fused=True (--amp): the fused kernel where this
+    build supports it on the model's device, else the foreach one.
+    """
+    if not fused:
+        return optim.AdamW(model.parameters(), lr=lr), 'default'
+    try:
+        return optim.AdamW(model.parameters(), lr=lr, fused=True), 'fused'
+    except (RuntimeError, TypeError, ValueError):
+        return optim.AdamW(model.parameters(), lr=lr, foreach=True), 'foreach'
+
+def rss_mb():
+    """{'rss', 'hwm'}: current and peak resident set size in MB from /proc/self/status (Linux), or None."""
+    fields = {'VmRSS': 'rss', 'VmHWM': 'hwm'}
+    usage = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    usage[fields[key]] = int(value.split()[0]) / 1024
+    except OSError:
+        return None
+    return usage if len(usage) == len(fields) else None
+
+def reset_peak_memory(device):
+    """
+    Starts a new peak-memory window: the CUDA allocator's peak, or the kernel's RSS high-water mark
+    (Linux: writing 5 to /proc/self/clear_refs). Returns False if the peak could not be reset.
+    """
+    if device.type == 'cuda':
+        torch.cuda.reset_peak_memory_stats(device)
+        return True
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_memory_mb(device, baseline_mb, peak_reset=True):
+    """
+    Peak memory of the training loop since reset_peak_memory(). CUDA: max_memory_allocated (tensors only).
+    Elsewhere: peak RSS above baseline_mb, the RSS taken just before the loop, so the data, model and
+    tokenization done at start-up are not counted. If the high-water mark could not be reset, the current
+    RSS is used instead (a lower bound). NaN where /proc is not available.
+    """
+    if device.type == 'cuda':
+        return torch.cuda.max_memory_allocated(device) / 2**20
+    usage = rss_mb()
+    if usage is None or baseline_mb is None:
+        return float('nan')
+    return (usage['hwm'] if peak_reset else usage['rss']) - baseline_mb
+
+def report_precision(config, precision, optimizer_impl, epoch_times, peak_mb):
+    """
+    Records this run's epoch time / peak memory per precision and compares against the fp32 baseline.
+    The AdamW variant is recorded too: --amp runs also switch to the fused optimizer, so the speedup
+    over fp32 covers both.
+    """
+    stats_path = os.path.join(config['checkpoint_dir'], 'precision_stats.json')
+    stats = {}
+    if os.path.exists(stats_path):
+        with open(stats_path, 'r') as f:
+            stats = json.load(f)
+    key = f"{config['device'].type}/{precision}"
+    stats[key] = {'epoch_s': sum(epoch_times) / len(epoch_times), 'peak_mb': peak_mb, 'epochs': len(epoch_times),
+                  'optimizer': optimizer_impl}
+    with open(stats_path, 'w') as f:
+        json.dump(stats, f, indent=2)
+    
+    current = stats[key]
+    print(f"⏱️ {precision} (AdamW {optimizer_impl}): {current['epoch_s']:.2f}s/epoch | peak memory {current['peak_mb']:.0f} MB")
+    baseline = stats.get(f"{config['device'].type}/fp32")
+    if precision != 'fp32':
+        if baseline:
+            print(f"   vs fp32 baseline (AdamW {baseline.get('optimizer', 'unrecorded')}): {baseline['epoch_s']:.2f}s/epoch ({baseline['epoch_s'] / current['epoch_s']:.2f}x) | "
+                  f"peak memory {baseline['peak_mb']:.0f} MB ({current['peak_mb'] - baseline['peak_mb']:+.0f} MB)")
+        else:
+            print("   No fp32 baseline recorded yet: run once without --amp to record it.")
+
+def build_loader(ds, batch_size, shuffle, num_workers=0, prefetch_factor=2, persistent_workers=True,
+                 pin_memory=False, batched_collate=True):
+    kwargs = {'num_workers': num_workers, 'pin_memory': pin_memory}
+    if num_workers > 0:
+        kwargs.update(prefetch_factor=prefetch_factor, persistent_workers=persistent_workers)
+    if batched_collate:
+        # Whole index batches go to DraftDataset.get_batch; batch_size=None turns off per-sample collation
+        sampler = RandomSampler(ds) if shuffle else SequentialSampler(ds)
+        return DataLoader(ds, sampler=BatchSampler(sampler, batch_size, drop_last=False), batch_size=None, **kwargs)
+    return DataLoader(ds, batch_size=batch_size, shuffle=shuffle, **kwargs)
+
+def loader_settings(config):
+    return {k: config[k] for k in ('num_workers', 'prefetch_factor', 'persistent_workers', 'pin_memory', 'batched_collate')}
+
+def loader_candidates(config, full=False):
+    """
+    Loader settings to probe: worker counts up to the CPU count (prefetch 2 / 4 with workers).
+    full=True also varies pin_memory (CUDA only) and includes the per-sample collate baseline.
+    """
+    cpus = os.cpu_count() or 1
+    base = loader_settings(config)
+    candidates = []
+    for workers in sorted({0, 1, 2, 4, 8} & set(range(min(cpus, 8) + 1))):
+        for prefetch in ((2, 4) if workers else (2,)):
+            candidates.append({**base, 'num_workers': workers, 'prefetch_factor': prefetch})
+    if full:
+        if config['device'].type == 'cuda':
+            candidates += [{**c, 'pin_memory': not c['pin_memory']} for c in candidates]
+        candidates.append({**base, 'num_workers': 0, 'batched_collate': False})
+    return candidates
+
+def describe_loader(settings):
+    desc = f"workers={settings['num_workers']}"
+    if settings['num_workers']:
+        desc += f" prefetch={settings['prefetch_factor']} persistent={settings['persistent_workers']}"
+    return desc + f" pin_memory={settings['pin_memory']} collate={'batched' if settings['batched_collate'] else 'per-sample'}"
+
+def probe_dataloaders(ds, batch_size, device, candidates, max_batches=50):
+    """Samples/sec (loading + host->device copy) of each loader setting. Returns [(settings, samples_per_sec)]."""
+    results = []
+    for settings in candidates:
+        loader = build_loader(ds, batch_size, shuffle=True, **settings)
+        batches = iter(loader)
+        next(batches, None)  # worker start-up is paid once per run (persistent workers)
+        samples = 0
+        start = time.perf_counter()
+        for _, batch in zip(range(max_batches), batches):
+            batch = {k: v.to(device, non_blocking=settings['pin_memory']) for k, v in batch.items()}
+            samples += batch['champ_ids'].size(0)
+        if device.type == 'cuda':
+            torch.cuda.synchronize()
+        elapsed = time.perf_counter() - start
+        del batches, loader
+        
+        rate = samples / elapsed if samples else 0.0
+        results.append((settings, rate))
+        print(f"   {describe_loader(settings)}: {rate:,.0f} samples/s")
+    return results
+
+def loader_probe_key(config, n_games):
+    return f"{os.path.abspath(config['train_path'])}|{n_games}|bs{config['batch_size']}|{config['device'].type}|cpus{os.cpu_count()}"
+
+def load_probed_loader(config, key):
+    """Fastest loader settings recorded for `key` by an earlier probe, or None."""
+    path = os.path.join(config['checkpoint_dir'], 'loader_probe.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f).get(key)
+
+def save_probed_loader(config, key, settings):
+    path = os.path.join(config['checkpoint_dir'], 'loader_probe.json')
+    cache = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            cache = json.load(f)
+    cache[key] = settings
+    os.makedirs(config['checkpoint_dir'], exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(cache, f, indent=2)
+
 def get_dataloaders(config, tokenizer):
     print("📦 Loading Datasets...")
     
@@ -50,22 +249,40 @@ def get_dataloaders(config, tokenizer):
     print(f"Train Size: {len(train_ds)}")
     print(f"Val Size: {len(val_ds)}")
     
-    train_loader = DataLoader(train_ds, batch_size=config['batch_size'], shuffle=True, num_workers=0)
+    settings = loader_settings(config)
+    if settings['num_workers'] == 'auto':
+        key = loader_probe_key(config, len(train_ds))
+        probed = load_probed_loader(config, key)
+        if probed is None:
+            print("⏱️ Probing DataLoader settings...")
+            results = probe_dataloaders(train_ds, config['batch_size'], config['device'],
+                                        loader_candidates(config), config['probe_batches'])
+            probed = max(results, key=lambda r: r[1])[0]
+            save_probed_loader(config, key, probed)
+        settings = probed
+    print(f"DataLoader: {describe_loader(settings)}")
+    
+    train_loader = build_loader(train_ds, config['batch_size'], shuffle=True, **settings)
     # Val shuffle=False is standard
-    val_loader = DataLoader(val_ds, batch_size=config['batch_size'], shuffle=False, num_workers=0)
+    val_loader = build_loader(val_ds, config['batch_size'], shuffle=False, **settings)
     
     return train_loader, val_loader
 
-def train():
+def train(overrides=None):
     config = get_config()
+    config.update(overrides or {})
     device = config['device']
     print(f"🚀 Using device: {device}")
     
+    use_amp, amp_dtype, use_scaler = amp_settings(config)
+    precision = {torch.bfloat16: 'bf16', torch.float16: 'fp16'}.get(amp_dtype, 'fp32')
+    print(f"Precision: {precision}" + (" (autocast" + (" + grad scaling)" if use_scaler else ")") if use_amp else ""))
+    
     # 1. Load Tokenizer
     if not os.path.exists(config['vocab_path']):
         raise FileNotFoundError(f"Vocab found found at {config['vocab_path']}")
         
-    tokenizer = DraftTokenizer(config['vocab_path'])
+    tokenizer = DraftTokenizer(config['vocab_path'], config['class_path'])
     vocab_size = len(tokenizer.vocab)
     print(f"Vocab Size: {vocab_size}")
     
@@ -97,21 +314,31 @@ def train():
         dropout=0.1
     ).to(device)
     
-    optimizer = optim.AdamW(model.parameters(), lr=config['lr'])
+    optimizer, optimizer_impl = make_optimizer(model, config['lr'], fused=use_amp)
+    print(f"Optimizer: AdamW ({optimizer_impl})")
     criterion = nn.CrossEntropyLoss(ignore_index=tokenizer.pad_token_id)
+    # Loss scaling only matters for fp16 (bf16 has fp32's exponent range)
+    scaler = torch.amp.GradScaler(device.type, enabled=use_scaler)
     
     # 4. Training Loop
     os.makedirs(config['checkpoint_dir'], exist_ok=True)
+    epoch_times = []
+    peak_mb = 0.0
+    # CPU peak memory is measured as RSS above what the process holds before the first step
+    usage = rss_mb()
+    baseline_mb = usage['rss'] if usage else None
     
     for epoch in range(config['epochs']):
         model.train()
         total_loss = 0
+        peak_reset = reset_peak_memory(device)
+        epoch_start = time.perf_counter()
         
         loop = tqdm(train_loader, desc=f"Epoch {epoch+1}/{config['epochs']}")
         
         for batch in loop:
             # Move batch to device
-            batch = {k: v.to(device) for k, v in batch.items()}
+            batch = {k: v.to(device, non_blocking=config['pin_memory']) for k, v in batch.items()}
             
             # Forward
             # Context
@@ -129,40 +356,13 @@ def train():
                 'class_vecs': batch['class_vecs']
             }
             
-            logits = model(ctx_data, seq_data) # [B, T+1, Vocab]
-            
-            # Apply Constraint Mask
-            # Mask is [B, T, V]. Logits is [B, T+1, V].
-            # We align preds (remove last logit) to match mask.
-            # Or wait, logits[:, :-1] predicts sequence.
-            # mask aligned with input `champ_ids`.
-            
-            # Logits: [Ctx, Step1, Step2 ... StepN]
-            # Preds from Ctx -> Predicts Step1. Mask[0] should be empty (nothing taken).
-            # Preds from Step1 -> Predicts Step2. Mask[1] should have Step1 taken.
+            optimizer.zero_grad(set_to_none=True)
             
-            # Dataset returns mask aligned with `champ_ids` (Input Sequence).
-            # mask[0] corresponds to state at Step 1 Input? No.
-            # Loop in Dataset:
-            # i=0 (Input Step 1): Mask has nothing. Updates set with Step 1 Champ.
-            # i=1 (Input Step 2): Mask has Step 1 Champ.
-            
-            # Logics from Context (Index 0) -> Predicts Step 1.
-            # Is Mask[0] the constraint for predicting Step 1?
-            # Dataset Loop: i=0. Mask is empty.
-            # So yes: Mask[0] = Constraints for prediction at Step 0 (which predicts Step 1).
-            
-            # However, logits has T+1. We ignore the last logit for training usually (predicts future).
-            # But here `preds = logits[:, :batch['champ_ids'].size(1), :]`.
-            # This aligns exactly with `batch['champ_ids']`.
-            # So `preds` has shape [B, T, V].
-            # `constraint_mask` has shape [B, T, V].
-            
-            mask = batch['constraint_mask'].to(device)
-            masked_logits = logits[:, :mask.size(1), :] + mask
+            with torch.autocast(device.type, dtype=amp_dtype, enabled=use_amp):
+                logits = model(ctx_data, seq_data) # [B, T+1, Vocab]
             
-            # Use MASKED logits for prediction/loss
-            preds = masked_logits
+            # No constraint mask in the training loss: standard next-token cross-entropy on the raw logits.
+            # (Validation masks already-taken champions, see below.)
             
             # Targets
             # We want to predict Step T given History <T.
@@ -206,11 +406,12 @@ def train():
             preds = logits[:, :batch['champ_ids'].size(1), :]
             targets = batch['champ_ids']
             
-            loss = criterion(preds.reshape(-1, vocab_size), targets.reshape(-1))
+            # Loss in fp32 (logits may be bf16/fp16 under autocast)
+            loss = criterion(preds.float().reshape(-1, vocab_size), targets.reshape(-1))
             
-            optimizer.zero_grad()
-            loss.backward()
-            optimizer.step()
+            scaler.scale(loss).backward()
+            scaler.step(optimizer)
+            scaler.update()
             
             total_loss += loss.item()
             loop.set_postfix(loss=loss.item())
@@ -226,7 +427,7 @@ def train():
         
         with torch.no_grad():
             for batch in val_loader:
-                batch = {k: v.to(device) for k, v in batch.items()}
+                batch = {k: v.to(device, non_blocking=config['pin_memory']) for k, v in batch.items()}
                 
                 # Forward (Same as train)
                 ctx_data = {
@@ -242,11 +443,14 @@ def train():
                     'class_vecs': batch['class_vecs']
                 }
                 
-                logits = model(ctx_data, seq_data) # [B, T+1, Vocab]
+                with torch.autocast(device.type, dtype=amp_dtype, enabled=use_amp):
+                    logits = model(ctx_data, seq_data) # [B, T+1, Vocab]
+                logits = logits.float()
                 
-                # Apply Constraint Mask
-                mask = batch['constraint_mask'].to(device)
-                masked_logits = logits[:, :mask.size(1), :] + mask
+                # Apply Constraint Mask: champions taken at an earlier step, built on-device from champ_ids
+                seq_len = batch['champ_ids'].size(1)
+                taken = cumulative_seen_mask(batch['champ_ids'], vocab_size, tokenizer.pad_token_id)
+                masked_logits = logits[:, :seq_len, :].masked_fill(taken, float('-inf'))
                 
                 # Align Preds & Targets
                 preds = masked_logits # [B, T, Vocab]
@@ -285,10 +489,53 @@ def train():
         val_acc_1 = correct_top1 / total_tokens if total_tokens > 0 else 0
         val_acc_5 = correct_top5 / total_tokens if total_tokens > 0 else 0
         
-        print(f"Epoch {epoch+1} | Train Loss: {avg_loss:.4f} | Val Loss: {avg_val_loss:.4f} | Val Acc@1: {val_acc_1:.2%} | Val Acc@5: {val_acc_5:.2%}")
+        epoch_times.append(time.perf_counter() - epoch_start)
+        peak_mb = max(peak_mb, peak_memory_mb(device, baseline_mb, peak_reset))
+        
+        print(f"Epoch {epoch+1} | Train Loss: {avg_loss:.4f} | Val Loss: {avg_val_loss:.4f} | Val Acc@1: {val_acc_1:.2%} | Val Acc@5: {val_acc_5:.2%} | {epoch_times[-1]:.1f}s")
         
         # Save Checkpoint
         torch.save(model.state_dict(), f"{config['checkpoint_dir']}/model_epoch_{epoch+1}.pt")
+    
+    # Self-describing bundle of the final weights (architecture + vocab + class DB) for serving
+    save_bundle(
+        os.path.join(config['checkpoint_dir'], 'draft_bundle'),
+        f"{config['checkpoint_dir']}/model_epoch_{config['epochs']}.pt",
+        config['vocab_path'],
+        config['class_path'],
+        {'d_model': config['d_model'], 'nhead': config['n_heads'], 'num_layers': config['n_layers']}
+    )
+    
+    report_precision(config, precision, optimizer_impl, epoch_times, peak_mb)
+
+def probe_loaders():
+    """Prints samples/sec of every DataLoader setting on the train set (see loader_candidates) and caches the fastest."""
+    config = get_config()
+    tokenizer = DraftTokenizer(config['vocab_path'], config['class_path'])
+    train_ds = DraftDataset(config['train_path'], tokenizer, max_len=config['max_len'])
+    print(f"⏱️ DataLoader probe on {len(train_ds)} games (batch size {config['batch_size']}, device {config['device']}):")
+    results = probe_dataloaders(train_ds, config['batch_size'], config['device'],
+                                loader_candidates(config, full=True), config['probe_batches'])
+    best, rate = max(results, key=lambda r: r[1])
+    print(f"🏆 Fastest: {describe_loader(best)} ({rate:,.0f} samples/s)")
+    save_probed_loader(config, loader_probe_key(config, len(train_ds)), best)
 
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser(description="Train the DraftTransformer")
+    parser.add_argument("--probe-loaders", action="store_true", help="Report DataLoader samples/sec per setting and exit")
+    parser.add_argument("--amp", action="store_true", help="Mixed precision: bf16 autocast on CPU, bf16/fp16 on CUDA")
+    parser.add_argument("--amp-dtype", choices=["auto", "bf16", "fp16"], default="auto", help="CUDA autocast dtype")
+    parser.add_argument("--epochs", type=int, default=None, help="Override the default schedule")
+    parser.add_argument("--num-workers", default=None,
+                        help="DataLoader workers, or 'auto' to use the fastest probed setting (cached per dataset)")
+    args = parser.parse_args()
+    
+    if args.probe_loaders:
+        probe_loaders()
+    else:
+        overrides = {'amp': args.amp, 'amp_dtype': args.amp_dtype}
+        if args.epochs:
+            overrides['epochs'] = args.epochs
+        if args.num_workers is not None:
+            overrides['num_workers'] = args.num_workers if args.num_workers == 'auto' else int(args.num_workers)
+        train(overrides)
@@ -0,0 +1,99 @@
+
+import torch
+import sys
+import os
+import copy
+import time
+from torch.utils.data import DataLoader
+from tqdm import tqdm
+
+# Add src to path
+sys.path.append(os.getcwd())
+
+from src.dataset import DraftDataset
+from src.bundle import open_bundle
+from src.quantization import quantize_model_int8
+
+def run_model(model, loader, vocab_size, pad_token_id):
+    """Returns (top1 hits, top5 hits, total tokens, per-token top-1 predictions, seconds)."""
+    correct_top1 = 0
+    correct_top5 = 0
+    total_tokens = 0
+    top1_preds = []
+    elapsed = 0.0
+    
+    with torch.no_grad():
+        for batch in loader:
+            ctx = {k: v for k, v in batch.items() if k.startswith('context')}
+            seq = {
+                'champ_ids': batch['champ_ids'],
+                'action_ids': batch['action_ids'],
+                'team_ids': batch['team_ids'],
+                'pos_ids': batch['pos_ids'],
+                'class_vecs': batch['class_vecs']
+            }
+            
+            start = time.perf_counter()
+            logits = model(ctx, seq) # [B, T+1, V]
+            elapsed += time.perf_counter() - start
+            
+            # Align: logits[:, :-1] predicts champ_ids, padding masked out
+            flat_preds = logits[:, :batch['champ_ids'].size(1), :].reshape(-1, vocab_size)
+            flat_targets = batch['champ_ids'].reshape(-1)
+            mask = flat_targets != pad_token_id
+            flat_preds = flat_preds[mask]
+            flat_targets = flat_targets[mask]
+            
+            if flat_targets.numel() == 0: continue
+            
+            total_tokens += flat_targets.numel()
+            top1 = flat_preds.argmax(1)
+            correct_top1 += (top1 == flat_targets).sum().item()
+            top5 = flat_preds.topk(5, 1).indices
+            correct_top5 += (top5 == flat_targets.unsqueeze(1)).any(1).sum().item()
+            top1_preds.append(top1)
+    
+    preds = torch.cat(top1_preds) if top1_preds else torch.empty(0, dtype=torch.long)
+    return correct_top1, correct_top5, total_tokens, preds, elapsed
+
+def evaluate_quantized():
+    # Config
+    MODEL_PATH = "checkpoints/model_epoch_20.pt"
+    VOCAB_PATH = "Data/metadata/vocab.json"
+    CLASS_PATH = "champion_classes.json"
+    BUNDLE_PATH = "checkpoints/draft_bundle" # Used instead of the loose files when present
+    DATA_PATH = "Data/processed/test_games.json"
+    BATCH_SIZE = 32
+    
+    print(f"📊 int8 vs fp32 Accuracy Delta (CPU)...")
+    
+    # Dynamic quantization is a CPU feature: both models are evaluated on CPU
+    bundle = open_bundle(BUNDLE_PATH, MODEL_PATH, VOCAB_PATH, CLASS_PATH, device='cpu')
+    if not bundle.has_weights:
+        print("❌ Model not found.")
+        return
+
+    tokenizer = bundle.tokenizer
+    test_ds = DraftDataset(DATA_PATH, tokenizer)
+    test_loader = DataLoader(test_ds, batch_size=BATCH_SIZE, shuffle=False)
+    vocab_size = len(tokenizer.vocab)
+    
+    model = bundle.model
+    q_model = quantize_model_int8(copy.deepcopy(model))
+    
+    results = {}
+    for name, m in (("fp32", model), ("int8", q_model)):
+        results[name] = run_model(m, tqdm(test_loader, desc=name), vocab_size, tokenizer.pad_token_id)
+    
+    print(f"\n🏆 Results on {len(test_ds)} games ({results['fp32'][2]} draft decisions):")
+    print(f"   {'':6} {'Top-1':>8} {'Top-5':>8} {'Time':>8}")
+    for name, (top1, top5, total, _, elapsed) in results.items():
+        print(f"   {name:6} {top1 / total:8.2%} {top5 / total:8.2%} {elapsed:7.2f}s")
+    
+    (f_top1, f_top5, total, f_preds, f_time), (q_top1, q_top5, _, q_preds, q_time) = results['fp32'], results['int8']
+    print(f"   Δ Top-1: {(q_top1 - f_top1) / total:+.2%}   Δ Top-5: {(q_top5 - f_top5) / total:+.2%}")
+    print(f"   Top-1 agreement int8 vs fp32: {(f_preds == q_preds).float().mean().item():.2%}")
+    print(f"   Speedup: {f_time / q_time:.2f}x")
+
+if __name__ == "__main__":
+    evaluate_quantized()
@@ -8,14 +8,15 @@ from tqdm import tqdm
 # Add src to path
 sys.path.append(os.getcwd())
 
-from src.tokenizer import DraftTokenizer
 from src.dataset import DraftDataset
-from src.model import DraftTransformer
+from src.bundle import open_bundle
 
 def evaluate():
     # Config
     MODEL_PATH = "checkpoints/model_epoch_20.pt"
     VOCAB_PATH = "Data/metadata/vocab.json"
+    CLASS_PATH = "champion_classes.json"
+    BUNDLE_PATH = "checkpoints/draft_bundle" # Used instead of the loose files when present
     # Direct File
     DATA_PATH = "Data/processed/test_games.json"
     DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'mps' if torch.backends.mps.is_available() else 'cpu')
@@ -23,11 +24,12 @@ def evaluate():
     
     print(f"📊 Running Full Test Set Evaluation...")
     
-    if not os.path.exists(MODEL_PATH):
+    bundle = open_bundle(BUNDLE_PATH, MODEL_PATH, VOCAB_PATH, CLASS_PATH, device=DEVICE)
+    if not bundle.has_weights:
         print("❌ Model not found.")
         return
 
-    tokenizer = DraftTokenizer(VOCAB_PATH)
+    tokenizer = bundle.tokenizer
     # Important: Load direct file
     test_ds = DraftDataset(DATA_PATH, tokenizer)
     test_loader = DataLoader(test_ds, batch_size=BATCH_SIZE, shuffle=False)
@@ -35,9 +37,7 @@ def evaluate():
     print(f"Test Set Size: {len(test_ds)} games")
     
     # Init Model
-    model = DraftTransformer(len(tokenizer.vocab), len(tokenizer.vocab), d_model=256, nhead=8, num_layers=6).to(DEVICE)
-    model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
-    model.eval()
+    model = bundle.model
     
     correct_top1 = 0
     correct_top5 = 0
@@ -8,25 +8,27 @@ from tqdm import tqdm
 # Add src to path
 sys.path.append(os.getcwd())
 
-from src.tokenizer import DraftTokenizer
 from src.dataset import DraftDataset
-from src.model import DraftTransformer
+from src.bundle import open_bundle
 
 def evaluate_train():
     # Config
     MODEL_PATH = "checkpoints/model_epoch_48.pt"
     VOCAB_PATH = "Data/metadata/vocab.json"
+    CLASS_PATH = "champion_classes.json"
+    BUNDLE_PATH = "checkpoints/draft_bundle" # Used instead of the loose files when present
     DATA_PATH = "Data/processed/train_games.json"
     DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'mps' if torch.backends.mps.is_available() else 'cpu')
     BATCH_SIZE = 32
     
     print(f"📊 Running Training Set Evaluation (Sanity Check)...")
     
-    if not os.path.exists(MODEL_PATH):
+    bundle = open_bundle(BUNDLE_PATH, MODEL_PATH, VOCAB_PATH, CLASS_PATH, device=DEVICE)
+    if not bundle.has_weights:
         print("❌ Model not found.")
         return
 
-    tokenizer = DraftTokenizer(VOCAB_PATH)
+    tokenizer = bundle.tokenizer
     # Important: Load direct file
     train_ds = DraftDataset(DATA_PATH, tokenizer)
     train_loader = DataLoader(train_ds, batch_size=BATCH_SIZE, shuffle=False)
@@ -34,9 +36,7 @@ def evaluate_train():
     print(f"Train Set Size: {len(train_ds)} games")
     
     # Init Model
-    model = DraftTransformer(len(tokenizer.vocab), len(tokenizer.vocab), d_model=256, nhead=8, num_layers=6).to(DEVICE)
-    model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
-    model.eval()
+    model = bundle.model
     
     correct_top1 = 0
     correct_top5 = 0
@@ -7,29 +7,29 @@ import readline # For better input handling
 # Add src to path
 sys.path.append(os.getcwd())
 
-from src.tokenizer import DraftTokenizer
-from src.model import DraftTransformer
+from src.bundle import open_bundle
+from src.constraints import mask_seen
 
 def interactive_test():
     # Config
     MODEL_PATH = "checkpoints/model_epoch_48.pt"
     VOCAB_PATH = "Data/metadata/vocab.json"
+    BUNDLE_PATH = "checkpoints/draft_bundle" # Used instead of the loose files when present
     DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'mps' if torch.backends.mps.is_available() else 'cpu')
     
     print(f"🔧 Interactive Draft Tool on {DEVICE}")
     print("-----------------------------------")
     
     # 1. Load Resources
-    if not os.path.exists(VOCAB_PATH) or not os.path.exists(MODEL_PATH):
+    bundle = open_bundle(BUNDLE_PATH, MODEL_PATH, VOCAB_PATH, device=DEVICE)
+    if not os.path.exists(bundle.vocab_path) or not bundle.has_weights:
         print("❌ Missing vocab or model checkpoint.")
         return
         
-    tokenizer = DraftTokenizer(VOCAB_PATH)
+    tokenizer = bundle.tokenizer
     vocab_size = len(tokenizer.vocab)
     
-    model = DraftTransformer(vocab_size, vocab_size, d_model=256, nhead=8, num_layers=6).to(DEVICE)
-    model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
-    model.eval()
+    model = bundle.model
     
     print("✅ System Ready.")
     
@@ -100,9 +100,8 @@ def interactive_test():
             target_idx = len(history_list)
             target_logit = logits[0, target_idx, :]
             
-            # Constraint Mask
-            for c in seen_champs:
-                target_logit[c] = float('-inf')
+            # Constraint Mask (single index_fill_)
+            mask_seen(target_logit, seen_champs)
                 
             probs, indices = torch.topk(torch.softmax(target_logit, dim=-1), 5)
             
@@ -7,8 +7,7 @@ import json
 # Add src to path
 sys.path.append(os.getcwd())
 
-from src.tokenizer import DraftTokenizer
-from src.model import DraftTransformer
+from src.bundle import open_bundle
 
 # ==========================================
 # 🔧 USER CONFIGURATION AREA
@@ -36,6 +35,7 @@ GAME_INPUT = {
 MODEL_PATH = "checkpoints/model_epoch_20.pt"
 VOCAB_PATH = "Data/metadata/vocab.json"
 CLASS_PATH = "champion_classes.json"
+BUNDLE_PATH = "checkpoints/draft_bundle" # Used instead of the loose files when present
 # ==========================================
 
 def manual_test():
@@ -43,10 +43,11 @@ def manual_test():
     print(f"🔧 Loading Manual Test on {DEVICE}...")
 
     # 1. Load Tokenizer
-    if not os.path.exists(VOCAB_PATH):
+    bundle = open_bundle(BUNDLE_PATH, MODEL_PATH, VOCAB_PATH, device=DEVICE)
+    if not os.path.exists(bundle.vocab_path):
         print("❌ Vocab not found.")
         return
-    tokenizer = DraftTokenizer(VOCAB_PATH)
+    tokenizer = bundle.tokenizer
     vocab_size = len(tokenizer.vocab)
     print(f"📚 Vocab Size: {vocab_size}")
 
@@ -61,22 +62,12 @@ def manual_test():
             champ_to_classes[c].append(cls)
 
     # 2. Load Model
-    if not os.path.exists(MODEL_PATH):
-        print(f"❌ Model checkpoint not found at {MODEL_PATH}")
+    if not bundle.has_weights:
+        print(f"❌ Model checkpoint not found at {bundle.weights_path}")
         return
 
-    model = DraftTransformer(
-        vocab_size=vocab_size,
-        team_vocab_size=vocab_size,
-        d_model=256,
-        nhead=8,
-        num_layers=6
-    ).to(DEVICE)
-    
     try:
-        state_dict = torch.load(MODEL_PATH, map_location=DEVICE)
-        model.load_state_dict(state_dict)
-        model.eval()
+        model = bundle.model
         print(f"✅ Loaded Model")
     except Exception as e:
         print(f"❌ Failed to load model: {e}")
@@ -8,32 +8,33 @@ from torch.utils.data import DataLoader
 # Add src to path
 sys.path.append(os.getcwd())
 
-from src.tokenizer import DraftTokenizer
 from src.dataset import DraftDataset
-from src.model import DraftTransformer
+from src.bundle import open_bundle
+from src.constraints import cumulative_seen_mask
 
 def random_test():
     # Config
     # Config
     MODEL_PATH = "checkpoints/model_epoch_20.pt"
     VOCAB_PATH = "Data/metadata/vocab.json"
+    CLASS_PATH = "champion_classes.json"
+    BUNDLE_PATH = "checkpoints/draft_bundle" # Used instead of the loose files when present
     DATA_PATH = "Data/processed/test_games.json"
     DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'mps' if torch.backends.mps.is_available() else 'cpu')
     SAMPLES = 3
     
     print(f"🎲 Running Random Sample Test ({SAMPLES} samples)...")
     
-    if not os.path.exists(MODEL_PATH):
+    bundle = open_bundle(BUNDLE_PATH, MODEL_PATH, VOCAB_PATH, CLASS_PATH, device=DEVICE)
+    if not bundle.has_weights:
         print("❌ Model not found.")
         return
 
-    tokenizer = DraftTokenizer(VOCAB_PATH)
+    tokenizer = bundle.tokenizer
     test_ds = DraftDataset(DATA_PATH, tokenizer)
     
     # Init Model
-    model = DraftTransformer(len(tokenizer.vocab), len(tokenizer.vocab), d_model=256, nhead=8, num_layers=6).to(DEVICE)
-    model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
-    model.eval()
+    model = bundle.model
     
     # Pick Indices
     indices = random.sample(range(len(test_ds)), SAMPLES)
@@ -76,7 +77,9 @@ def random_test():
         team_ids = sample['team_ids']
         
         valid_len = (champ_ids != tokenizer.pad_token_id).sum().item()
-        seen_champs = set()
+        
+        # Constraint Mask for every step at once: [T, Vocab] True = already taken
+        seen_mask = cumulative_seen_mask(seq['champ_ids'], len(tokenizer.vocab), tokenizer.pad_token_id)[0]
         
         # Final Summary Containers
         blue_picks = []
@@ -114,17 +117,10 @@ def random_test():
                     print(f"  (+) Step {h+1}: {h_team_name[:4]} {h_act} {h_name}")
 
             # --- MODEL PREDICTION ---
-            logit = logits[0, t, :]
-            
-            # Constraint Mask
-            for c in seen_champs:
-                logit[c] = float('-inf')
+            logit = logits[0, t, :].masked_fill(seen_mask[t], float('-inf'))
                 
             probs, indices = torch.topk(torch.softmax(logit, dim=-1), 5)
             
-            # --- UPDATE STATE FOR NEXT STEP ---
-            seen_champs.add(true_token)
-            
             # Collect for summary
             act_id = action_ids[t].item()
             team_id = team_ids[t].item()
@@ -0,0 +1,188 @@
+"""
+Self-describing model bundle: one directory with everything needed to rebuild the draft model.
+
+    <bundle>/
+        config.json             format version + DraftTransformer architecture
+        weights.pt              state dict
+        vocab.json
+        champion_classes.json   class DB the [vocab, 6] class table is built from (optional)
+
+Opening a bundle only reads config.json. The tokenizer and the model are built on first use, so
+tokenizer-only processes never import torch or touch the weights.
+
+    python bundle.py --checkpoint model_epoch_20.pt --vocab vocab.json --classes champion_classes.json --out draft_bundle
+"""
+import argparse
+import importlib
+import json
+import os
+import shutil
+
+BUNDLE_FORMAT = "draft-transformer-bundle"
+BUNDLE_VERSION = 1
+
+CONFIG_NAME = "config.json"
+WEIGHTS_NAME = "weights.pt"
+VOCAB_NAME = "vocab.json"
+CLASS_DB_NAME = "champion_classes.json"
+
+# Architecture the released checkpoints were trained with (see get_config in train.py).
+# Teams share the champion vocab, so team_vocab_size defaults to vocab_size.
+DEFAULT_ARCHITECTURE = {'d_model': 256, 'nhead': 8, 'num_layers': 6, 'dropout': 0.1}
+
+
+def _import_sibling(name):
+    """Imports model / tokenizer from this folder, as a package (src.model) or a flat module on sys.path."""
+    if __package__:
+        return importlib.import_module(f"{__package__}.{name}")
+    return importlib.import_module(name)
+
+
+def _vocab_size(vocab_path):
+    with open(vocab_path, 'r') as f:
+        return len(json.load(f))
+
+
+class DraftBundle:
+    """
+    Weights + vocab + class DB + architecture, with the tokenizer and model built lazily.
+    Use open_bundle() / save_bundle() rather than building one directly.
+    """
+    def __init__(self, config, weights_path, vocab_path, class_db_path=None, device='cpu'):
+        self.config = config
+        self.weights_path = weights_path
+        self.vocab_path = vocab_path
+        self.class_db_path = class_db_path
+        self.device = device
+        self._tokenizer = None
+        self._model = None
+
+    @classmethod
+    def load(cls, path, device='cpu'):
+        with open(os.path.join(path, CONFIG_NAME), 'r') as f:
+            config = json.load(f)
+        if config.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"{path} is not a draft model bundle")
+        if config.get('version', 0) > BUNDLE_VERSION:
+            raise ValueError(f"Bundle version {config['version']} is newer than this loader ({BUNDLE_VERSION})")
+        files = config['files']
+        class_db = files.get('class_db')
+        return cls(
+            config,
+            os.path.join(path, files['weights']),
+            os.path.join(path, files['vocab']),
+            os.path.join(path, class_db) if class_db else None,
+            device
+        )
+
+    @classmethod
+    def from_files(cls, checkpoint_path, vocab_path, class_db_path=None, architecture=None, device='cpu'):
+        """Legacy layout: loose checkpoint / vocab / class DB files plus the default architecture."""
+        config = {
+            'format': BUNDLE_FORMAT,
+            'version': BUNDLE_VERSION,
+            'architecture': dict(architecture or DEFAULT_ARCHITECTURE)
+        }
+        return cls(config, checkpoint_path, vocab_path, class_db_path, device)
+
+    @property
+    def architecture(self):
+        """DraftTransformer kwargs, with vocab sizes filled in from the vocab when not recorded."""
+        arch = dict(self.config['architecture'])
+        if 'vocab_size' not in arch:
+            arch['vocab_size'] = _vocab_size(self.vocab_path)
+        arch.setdefault('team_vocab_size', arch['vocab_size'])
+        return arch
+
+    @property
+    def has_weights(self):
+        return self.weights_path is not None and os.path.exists(self.weights_path)
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            DraftTokenizer = _import_sibling('tokenizer').DraftTokenizer
+            class_db = self.class_db_path if self.class_db_path and os.path.exists(self.class_db_path) else None
+            self._tokenizer = DraftTokenizer(self.vocab_path, class_db)
+        return self._tokenizer
+
+    def build_model(self):
+        """Untrained DraftTransformer with this bundle's architecture (e.g. to quantize or to load into)."""
+        DraftTransformer = _import_sibling('model').DraftTransformer
+        return DraftTransformer(**self.architecture)
+
+    def model_from_checkpoint(self, checkpoint_path):
+        """Loads another checkpoint of this bundle's architecture (e.g. an earlier epoch), class table set."""
+        load_draft_model = _import_sibling('model').load_draft_model
+        arch = self.architecture
+        model = load_draft_model(
+            checkpoint_path, arch.pop('vocab_size'), arch.pop('team_vocab_size'), self.device, **arch
+        )
+        if self.tokenizer.class_table is not None:
+            model.set_class_table(self.tokenizer.class_table)
+        return model
+
+    @property
+    def model(self):
+        """The trained model in eval mode (memory-mapped weights, class table set), loaded on first use."""
+        if self._model is None:
+            self._model = self.model_from_checkpoint(self.weights_path)
+        return self._model
+
+
+def open_bundle(path=None, checkpoint_path=None, vocab_path=None, class_db_path=None, device='cpu'):
+    """
+    The bundle at `path` if there is one, otherwise the legacy loose files
+    (checkpoint_path may be None for tokenizer-only use).
+    """
+    if path and os.path.exists(os.path.join(path, CONFIG_NAME)):
+        return DraftBundle.load(path, device)
+    if vocab_path is None:
+        raise FileNotFoundError(f"No model bundle at {path} and no vocab path given")
+    return DraftBundle.from_files(checkpoint_path, vocab_path, class_db_path, device=device)
+
+
+def save_bundle(path, checkpoint_path, vocab_path, class_db_path=None, architecture=None):
+    """Writes a bundle directory from a state-dict checkpoint and its vocab / class DB. Returns the DraftBundle."""
+    os.makedirs(path, exist_ok=True)
+    vocab_size = _vocab_size(vocab_path)
+    arch = {'vocab_size': vocab_size, 'team_vocab_size': vocab_size, **DEFAULT_ARCHITECTURE, **(architecture or {})}
+
+    files = {'weights': WEIGHTS_NAME, 'vocab': VOCAB_NAME}
+    shutil.copyfile(checkpoint_path, os.path.join(path, WEIGHTS_NAME))
+    shutil.copyfile(vocab_path, os.path.join(path, VOCAB_NAME))
+    if class_db_path and os.path.exists(class_db_path):
+        shutil.copyfile(class_db_path, os.path.join(path, CLASS_DB_NAME))
+        files['class_db'] = CLASS_DB_NAME
+
+    config = {
+        'format': BUNDLE_FORMAT,
+        'version': BUNDLE_VERSION,
+        'architecture': arch,
+        'files': files,
+        'source_checkpoint': os.path.basename(checkpoint_path)
+    }
+    with open(os.path.join(path, CONFIG_NAME), 'w') as f:
+        json.dump(config, f, indent=2)
+    return DraftBundle.load(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack a checkpoint, vocab and class DB into a model bundle")
+    parser.add_argument("--checkpoint", required=True)
+    parser.add_argument("--vocab", required=True)
+    parser.add_argument("--classes", default=None)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--d-model", type=int, default=DEFAULT_ARCHITECTURE['d_model'])
+    parser.add_argument("--nhead", type=int, default=DEFAULT_ARCHITECTURE['nhead'])
+    parser.add_argument("--num-layers", type=int, default=DEFAULT_ARCHITECTURE['num_layers'])
+    args = parser.parse_args()
+
+    bundle = save_bundle(args.out, args.checkpoint, args.vocab, args.classes, {
+        'd_model': args.d_model, 'nhead': args.nhead, 'num_layers': args.num_layers
+    })
+    print(f"✅ Wrote bundle to {args.out}: {bundle.architecture}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import torch
+
+# Dense constraint & boost layer for inference.
+# Instead of writing one scalar per taken champion / boosted champion from Python,
+# the constraints are built as index / dense tensors on the target device and applied
+# with a single index_fill_ (seen-masking) and a single fused add (boosts).
+
+
+def _check_champ_id(cid, vocab_size):
+    """Out-of-range ids would alias a champion of the neighbouring row in the flat index."""
+    cid = int(cid)
+    if not 0 <= cid < vocab_size:
+        raise ValueError(f"Champion id {cid} is outside the vocab [0, {vocab_size})")
+    return cid
+
+
+def build_seen_index(seen_id_sets, vocab_size, device=None):
+    """
+    seen_id_sets: One iterable of taken champion ids per row.
+    Returns a flat LongTensor of (row * vocab_size + champ_id) positions for index_fill_.
+    Raises ValueError for ids outside [0, vocab_size).
+    """
+    flat = [row * vocab_size + _check_champ_id(c, vocab_size) for row, seen_ids in enumerate(seen_id_sets) for c in seen_ids]
+    return torch.tensor(flat, dtype=torch.long, device=device)
+
+
+def build_boost_tensor(boost_maps, vocab_size, device=None):
+    """
+    boost_maps: One {champ_id: boost_value} dict (or None) per row.
+    Returns a dense [B, Vocab] float tensor (zeros where no boost applies).
+    Raises ValueError for ids outside [0, vocab_size).
+    """
+    rows, cols, vals = [], [], []
+    for row, boost_map in enumerate(boost_maps):
+        if boost_map:
+            for cid, val in boost_map.items():
+                rows.append(row)
+                cols.append(_check_champ_id(cid, vocab_size))
+                vals.append(float(val))
+    boosts = torch.zeros((len(boost_maps), vocab_size), dtype=torch.float, device=device)
+    if vals:
+        boosts.index_put_(
+            (torch.tensor(rows, device=device), torch.tensor(cols, device=device)),
+            torch.tensor(vals, dtype=torch.float, device=device),
+            accumulate=True
+        )
+    return boosts
+
+
+def apply_seen_mask_(logits, seen_index):
+    """
+    In-place: sets every (row, champ) position in seen_index to -inf.
+    logits: [Vocab] or [B, Vocab] (contiguous); seen_index from build_seen_index.
+    """
+    if seen_index.numel() > 0:
+        logits.view(-1).index_fill_(0, seen_index.to(logits.device), float('-inf'))
+    return logits
+
+
+def mask_seen(logits, seen_id_sets):
+    """Convenience wrapper: masks per-row seen ids of a [B, Vocab] (or [Vocab] with one set) tensor."""
+    if logits.dim() == 1:
+        seen_id_sets = [seen_id_sets]
+    return apply_seen_mask_(logits, build_seen_index(seen_id_sets, logits.size(-1), logits.device))
+
+
+def cumulative_seen_mask(champ_ids, vocab_size, pad_token_id=0):
+    """
+    Vectorized "already taken" mask for full drafts (replaces per-step Python loops).
+    champ_ids: [B, T] LongTensor of the drafted champions in order.
+    Returns bool [B, T, Vocab]: True where the champion was taken BEFORE step t
+    (step t's own champion is not included, PAD is never marked).
+    """
+    batch_size, seq_len = champ_ids.shape
+    taken = torch.zeros((batch_size, seq_len, vocab_size), dtype=torch.bool, device=champ_ids.device)
+    # One-hot of each step, then an exclusive prefix-OR along time
+    taken.scatter_(2, champ_ids.unsqueeze(-1), True)
+    taken[..., pad_token_id] = False
+    seen = taken.cumsum(dim=1) > 0
+    exclusive = torch.zeros_like(seen)
+    exclusive[:, 1:] = seen[:, :-1]
+    return exclusive
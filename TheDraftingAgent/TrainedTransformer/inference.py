@@ -6,14 +6,14 @@ import readline
 
 # Imports from local folder
 try:
-    from tokenizer import DraftTokenizer
-    from model import DraftTransformer
+    from bundle import open_bundle
+    from constraints import mask_seen
 except ImportError:
     # If running from root, these might fail without sys.path hack, 
     # but the idea is this folder is self-contained.
     sys.path.append(os.path.dirname(__file__))
-    from tokenizer import DraftTokenizer
-    from model import DraftTransformer
+    from bundle import open_bundle
+    from constraints import mask_seen
 
 def load_champion_classes(path):
     """
@@ -40,6 +40,7 @@ def main():
     MODEL_PATH = os.path.join(BASE_DIR, "model_epoch_20.pt")
     VOCAB_PATH = os.path.join(BASE_DIR, "vocab.json")
     CLASS_DB_PATH = os.path.join(BASE_DIR, "champion_classes.json")
+    BUNDLE_PATH = os.path.join(BASE_DIR, "draft_bundle") # Used instead of the loose files when present
     
     DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'mps' if torch.backends.mps.is_available() else 'cpu')
     
@@ -48,29 +49,26 @@ def main():
     print("-----------------------------------")
 
     # 2. Check Resources
-    if not os.path.exists(MODEL_PATH):
-        print(f"❌ Critical Error: Model file not found at {MODEL_PATH}")
+    bundle = open_bundle(BUNDLE_PATH, MODEL_PATH, VOCAB_PATH, CLASS_DB_PATH, device=DEVICE)
+    if not bundle.has_weights:
+        print(f"❌ Critical Error: Model file not found at {bundle.weights_path}")
         return
-    if not os.path.exists(VOCAB_PATH):
-        print(f"❌ Critical Error: Vocab file not found at {VOCAB_PATH}")
+    if not os.path.exists(bundle.vocab_path):
+        print(f"❌ Critical Error: Vocab file not found at {bundle.vocab_path}")
         return
 
     # 3. Load Data & Model
     print("Loading resources...")
-    tokenizer = DraftTokenizer(VOCAB_PATH)
+    tokenizer = bundle.tokenizer
     vocab_size = len(tokenizer.vocab)
     
-    champ_class_map = load_champion_classes(CLASS_DB_PATH)
+    champ_class_map = load_champion_classes(bundle.class_db_path or CLASS_DB_PATH)
     if not champ_class_map:
         print("⚠️  Warning: champion_classes.json not found or empty. Class features will be zeroed.")
 
-    # Initialize Model (Matching Training Params)
-    # Note: vocab_size passed twice because model expects team_vocab_size as 2nd arg.
-    # In interactive_test.py: DraftTransformer(vocab_size, vocab_size, ...)
-    model = DraftTransformer(vocab_size, vocab_size, d_model=256, nhead=8, num_layers=6).to(DEVICE)
-    
+    # Initialize Model (architecture from the bundle config; memory-mapped weights, class table set)
     try:
-        model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
+        model = bundle.model
     except Exception as e:
         print(f"❌ Error loading model weights: {e}")
         return
@@ -101,7 +99,8 @@ def main():
         print(f"\n{'='*20} Predicting Step {step_count} {'='*20}")
         
         # --- A. Encode Input ---
-        encoded = tokenizer.encode(context_dict, history_list, max_len=21)
+        # Only the real history + next slot (no padding to 21)
+        encoded = tokenizer.encode_for_inference(context_dict, history_list, max_len=21)
         
         ctx_data = encoded['context']
         seq_data = encoded['sequence']
@@ -113,36 +112,23 @@ def main():
             'context_game': torch.tensor([ctx_data['game_num']]).to(DEVICE)
         }
         
-        # Generate Class Multi-Hot Vector [B=1, T, 6]
-        # logic adapted from src/dataset.py
-        class_ids_list = seq_data['class_ids_list'] # List[List[int]]
-        num_classes = 6
-        class_tensor = torch.zeros((1, len(class_ids_list), num_classes), dtype=torch.float).to(DEVICE)
-        
-        for t, c_ids in enumerate(class_ids_list):
-            for cid in c_ids:
-                if 0 <= cid < num_classes:
-                    class_tensor[0, t, cid] = 1.0
-                    
+        # Class Multi-Hot Vector [B=1, T, 6] is gathered by the model from its class table
         seq_inputs = {
             'champ_ids': torch.tensor([seq_data['champion_ids']]).to(DEVICE),
             'action_ids': torch.tensor([seq_data['action_ids']]).to(DEVICE),
             'team_ids': torch.tensor([seq_data['team_ids']]).to(DEVICE),
-            'pos_ids': torch.tensor([seq_data['position_ids']]).to(DEVICE),
-            'class_vecs': class_tensor
+            'pos_ids': torch.tensor([seq_data['position_ids']]).to(DEVICE)
         }
         
         # --- B. Model Prediction ---
         with torch.no_grad():
-            logits = model(ctx_inputs, seq_inputs)
-            
             # Target is the next tokens (at index = len(history))
+            # Only that position is projected through the output head.
             target_idx = len(history_list)
-            target_logit = logits[0, target_idx, :]
+            target_logit = model.predict_at(ctx_inputs, seq_inputs, target_idx)[0]
             
-            # Mask Taken Champs
-            for c in seen_champs:
-                target_logit[c] = float('-inf')
+            # Mask Taken Champs (single index_fill_)
+            mask_seen(target_logit, seen_champs)
             
             # Top 5
             probs, indices = torch.topk(torch.softmax(target_logit, dim=-1), 5)
@@ -157,17 +143,10 @@ def main():
         if user_input.lower() in ['exit', 'quit']:
             break
             
-        # Validate
-        champ_id = tokenizer.vocab.get(user_input)
-        
-        # Case insensitive retry
-        if not champ_id:
-            # Try to find case-insensitive match
-            for k, v in tokenizer.vocab.items():
-                if k.upper() == user_input.upper():
-                    user_input = k
-                    champ_id = v
-                    break
+        # Validate (case / punctuation insensitive, tolerates typos)
+        champ_id = tokenizer.resolver.resolve(user_input, fuzzy=True)
+        if champ_id:
+            user_input = tokenizer.id_to_token[champ_id]
                     
         if not champ_id:
             print(f"⚠️  '{user_input}' not found in vocabulary.")
@@ -23,6 +23,22 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Load env vars from .env file in the root directory
 load_dotenv(os.path.join(BASE_DIR, '..', '.env'))
 
+# Champion name resolution (tokenizer only - no torch needed)
+sys.path.append(os.path.join(BASE_DIR, 'TrainedTransformer'))
+from tokenizer import ChampionResolver
+from bundle import open_bundle
+
+# Only the bundle's tokenizer is used here; its weights are never loaded
+champion_resolver = open_bundle(
+    os.getenv("MODEL_BUNDLE", os.path.join(BASE_DIR, 'TrainedTransformer/draft_bundle')),
+    vocab_path=os.path.join(BASE_DIR, 'TrainedTransformer/vocab.json')
+).tokenizer.resolver
+
+def champion_key(name):
+    """Normalized identity of a (voice / LLM sourced) champion name: handles ids, case, punctuation and typos."""
+    canonical = champion_resolver.canonical_name(name, fuzzy=True)
+    return ChampionResolver.normalize(canonical or name)
+
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 if GROQ_API_KEY:
@@ -268,6 +284,8 @@ def apply_actions(actions):
     
     for action in actions:
         team_key = f"{action['team']}_team"
+        # Snap transcribed / LLM names to the vocab spelling (e.g. "Kaisa" -> "Kai'Sa")
+        action['champion'] = champion_resolver.canonical_name(action['champion'], fuzzy=True) or action['champion']
         
         if action['type'] == 'ban':
             bans = draft_state[team_key]['bans']
@@ -627,41 +645,27 @@ def chat():
         invalid_champions = set()
         
         # Add all current picks and bans to invalid set
+        # (champion_key resolves Data Dragon ids like MonkeyKing/KSante, case, punctuation and typos)
         for team in ['blue_team', 'red_team']:
             for p in draft_state[team]['picks']:
-                if p: invalid_champions.add(p.lower())
+                if p: invalid_champions.add(champion_key(p))
             for b in draft_state[team]['bans']:
-                if b: invalid_champions.add(b.lower())
+                if b: invalid_champions.add(champion_key(b))
 
         # Add fearless bans from current state
-        fearless_mapping = {
-            'MonkeyKing': 'Wukong',
-            'KSante': "K'Sante",
-            'XinZhao': 'Xin Zhao',
-            'DrMundo': 'Dr Mundo',
-            'AurelionSol': 'Aurelion Sol',
-            'Kaisa': "Kai'Sa",
-            'MissFortune': 'Miss Fortune',
-            'Renata': 'Renata Glasc',
-            'JarvanIV': 'Jarvan IV',
-            'LeeSin': 'Lee Sin',
-            'Reksai': "Rek'Sai"
-        }
         for f in draft_state.get('fearless_bans', []):
             if f:
-                name = fearless_mapping.get(f, f)
-                invalid_champions.add(name.lower())
+                invalid_champions.add(champion_key(f))
 
         # Add fearless bans to invalid champions from request if provided
         req_fearless = data.get('fearless_bans', []) or data.get('fearlessBans', [])
-        req_fearless = [fearless_mapping.get(fb, fb) for fb in req_fearless]
         
         for champ in req_fearless:
             if champ:
-                invalid_champions.add(champ.lower())
+                invalid_champions.add(champion_key(champ))
                 
         if context_champion:
-            invalid_champions.add(context_champion.lower())
+            invalid_champions.add(champion_key(context_champion))
             
         # Filter the final list
         filtered_recs = []
@@ -669,9 +673,10 @@ def chat():
         
         for rec in final_recommendations:
             rec_clean = rec.strip()
-            if rec_clean.lower() not in invalid_champions and rec_clean not in seen_recs:
+            rec_key = champion_key(rec_clean)
+            if rec_key not in invalid_champions and rec_key not in seen_recs:
                 filtered_recs.append(rec_clean)
-                seen_recs.add(rec_clean)
+                seen_recs.add(rec_key)
         
         final_recommendations = filtered_recs
 